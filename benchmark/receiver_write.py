@@ -0,0 +1,48 @@
+"""Measure the throughput of :meth:`hdlc.Receiver.write` for 64 KB of input using the
+bulk copy and the per byte copy fallback.
+
+Run from the repository root with ``python benchmark/receiver_write.py``.
+"""
+import sys
+import timeit
+from os import path
+
+sys.path.insert(0, path.abspath(path.join(path.dirname(__file__), '..')))
+
+from hdlc import Receiver  # noqa: E402
+from hdlc import hdlc  # noqa: E402
+
+DATA_LENGTH = 64 * 1024
+CHUNK_LENGTH = 64
+REPEAT = 5
+
+def run(copy, chunk_length):
+    hdlc.copy = copy
+    data = bytes(i & 0xFF for i in range(DATA_LENGTH))
+    receiver = Receiver(buffer_length=DATA_LENGTH)
+
+    def write():
+        receiver.reset()
+
+        for offset in range(0, DATA_LENGTH, chunk_length):
+            receiver.write(data, offset, chunk_length)
+
+    number = 5 if copy is hdlc._copy_loop else 100
+    seconds = min(timeit.repeat(write, number=number, repeat=REPEAT)) / number
+    return DATA_LENGTH / seconds / (1024 * 1024)
+
+def main():
+    original_copy = hdlc.copy
+
+    try:
+        for chunk_length in (CHUNK_LENGTH, DATA_LENGTH):
+            loop = run(hdlc._copy_loop, chunk_length)
+            bulk = run(hdlc._copy_slice, chunk_length)
+
+            print(f'Receiver.write 64 KB in {chunk_length} byte chunks: '
+                + f'per byte {loop:.1f} MB/s, bulk {bulk:.1f} MB/s ({bulk / loop:.0f}x)')
+    finally:
+        hdlc.copy = original_copy
+
+if __name__ == '__main__':
+    main()
@@ -5,4 +5,4 @@ from .hdlc import (
     NORMAL_RESPONSE_MODE, ASYNCHRONOUS_RESPONSE_MODE, ASYNCHRONOUS_BALANCED_MODE,
     Frame, IFrame, SFrame, UFrame,
     HdlcError, TimeoutError,
-    Receiver, Sender, protocol)
+    Receiver, Sender, Demux, protocol, multidrop)
@@ -0,0 +1,181 @@
+import asyncio
+
+from .hdlc import TimeoutError, NORMAL_RESPONSE_MODE, protocol
+
+class Link(asyncio.Protocol):
+    """An :class:`asyncio.Protocol` running a receiver and sender pair created by :func:`hdlc.protocol`
+    on top of an asyncio transport. Incoming data is decoded as it arrives and resend timers are driven by
+    the monotonic clock of the event loop, so no periodic polling is needed.
+
+    The link is typically created with :meth:`asyncio.loop.create_connection` or similar, e.g.
+    ``transport, link = await loop.create_connection(lambda: Link(True, 0xAA), host, port)``.
+
+    :param master: If the link should act as a master node and initiate the communication
+        with the remote node.
+    :type master: bool
+    :param address: The address of the remote slave node if master is True, otherwise the address of
+        the current slave node.
+    :type address: int
+
+    The remaining parameters are passed on to :func:`hdlc.protocol`.
+
+    :ivar receiver: The receiver decoding incoming data.
+    :vartype receiver: :class:`hdlc.ProtocolReceiver`
+    :ivar sender: The sender encoding outgoing frames.
+    :vartype sender: :class:`hdlc.ProtocolSender`
+    """
+    def __init__(self, master, address, buffer_length=128, write_timeout_ms=500, write_retries=1,
+            mode=NORMAL_RESPONSE_MODE, window_size=1, extended=False, acknowledge_frames=1, acknowledge_delay_ms=0):
+        self.receiver, self.sender = protocol(master, address, buffer_length, write_timeout_ms, write_retries, mode,
+            window_size, extended, acknowledge_frames, acknowledge_delay_ms)
+        self._frame_buffer = bytearray(self.sender.frame_buffer_length)
+        self._messages = asyncio.Queue()
+        self._waiters = []
+        self._space = None
+        self._transport = None
+        self._loop = None
+        self._time = 0
+        self._timer = None
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._loop = asyncio.get_running_loop()
+        self._time = self._loop.time()
+        self._flush()
+
+    def data_received(self, data):
+        for message, frame, valid in self.receiver.iter_frames((data,)):
+            self._messages.put_nowait(message)
+
+        self._resolve()
+        self._flush()
+
+    def connection_lost(self, exc):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        self._transport = None
+        self._fail(exc if exc is not None else ConnectionError('Connection lost'))
+        self._messages.put_nowait(None)
+
+    async def send(self, buffer):
+        """Send data in an information frame and wait until the remote node has acknowledged it. Waits for
+        space in the sender buffer first if needed.
+
+        :param buffer: Data to send.
+        :type buffer: bytes
+
+        :raises:
+            - :class:`ValueError` - If the data is longer than the sender buffer.
+            - :class:`hdlc.TimeoutError` - If the frame was not acknowledged within the timeout and retry limit.
+            - :class:`ConnectionError` - If the connection was lost or the link was reset by a new handshake
+              before the frame was acknowledged.
+        """
+        if self._transport is None:
+            raise ConnectionError('Not connected')
+
+        while len(buffer) <= len(self.sender.buffer) and len(buffer) > self.sender.available_length:
+            if self._space is None:
+                self._space = self._loop.create_future()
+
+            await self._space
+
+        frame = self.sender.write(buffer)
+        future = self._loop.create_future()
+        self._waiters.append((frame, self.sender.generation, future))
+        self._flush()
+        await future
+
+    def close(self):
+        """Close the underlying transport. Pending :meth:`hdlc.aio.Link.send` calls fail and iteration
+        over received messages stops.
+        """
+        if self._transport is not None:
+            self._transport.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self._messages.get()
+
+        if message is None:
+            # Keep the end marker for later iterations
+            self._messages.put_nowait(None)
+            raise StopAsyncIteration
+
+        return message
+
+    def _flush(self):
+        if self._transport is None:
+            return
+
+        elapsed_ms = int((self._loop.time() - self._time) * 1000)
+        self._time += elapsed_ms / 1000
+
+        try:
+            errors = self.sender.drain(self._frame_buffer, self._transport.write, elapsed_ms)
+        except TimeoutError as e:
+            # The handshake failed, the link is unusable
+            self._fail(e)
+            self.close()
+            return
+
+        for error in errors:
+            self._timeout(error)
+
+        self._schedule()
+
+    def _schedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        timeout_ms = self.sender.timeout_ms
+
+        if timeout_ms is not None:
+            self._timer = self._loop.call_at(self._time + timeout_ms / 1000, self._flush)
+
+    def _timeout(self, error):
+        for waiter in self._waiters:
+            if waiter[0] is error.frame:
+                self._waiters.remove(waiter)
+
+                if not waiter[2].done():
+                    waiter[2].set_exception(error)
+
+                self._wake(None)
+                return
+
+    def _resolve(self):
+        self._waiters, acknowledged, dropped = self.sender.settle(self._waiters)
+
+        for future in acknowledged:
+            if not future.done():
+                future.set_result(None)
+
+        for future in dropped:
+            if not future.done():
+                future.set_exception(ConnectionError('Link reset before the frame was acknowledged'))
+
+        self._wake(None)
+
+    def _wake(self, error):
+        space, self._space = self._space, None
+
+        if space is None or space.done():
+            return
+
+        if error is None:
+            space.set_result(None)
+        else:
+            space.set_exception(error)
+
+    def _fail(self, error):
+        waiters, self._waiters = self._waiters, []
+        self._wake(error)
+
+        for frame, generation, future in waiters:
+            if not future.done():
+                future.set_exception(error)
@@ -0,0 +1,125 @@
+import mmap
+import multiprocessing
+
+from .hdlc import _FLAG_BYTES, decode_frame
+
+def split(buffer, chunk_length, start=0, end=None):
+    """Split a buffer into chunks of about the given length at flag bytes, so no frame is split between
+    two chunks. Consecutive chunks share the flag at the boundary.
+
+    :param buffer: Buffer containing encoded frames, e.g. bytes or a memory mapped file.
+    :type buffer: bytes
+    :param chunk_length: Minimum length of a chunk. The last chunk may be shorter.
+    :type chunk_length: int
+    :param start: Offset into the buffer where the first chunk starts.
+    :type start: int
+    :param end: Offset into the buffer where the last chunk ends. Default is the end of the buffer.
+    :type end: int
+
+    :returns: Start and end offsets of each chunk.
+    :rtype: generator
+
+    :raises:
+        - :class:`ValueError` - If the chunk length is not positive.
+    """
+    if chunk_length <= 0:
+        raise ValueError('Invalid chunk length')
+
+    end = len(buffer) if end is None else end
+
+    while start < end:
+        boundary = buffer.find(_FLAG_BYTES, start + chunk_length, end)
+
+        if boundary < 0:
+            boundary = end
+
+        yield (start, boundary)
+        start = boundary
+
+def iter_frames(buffer, start=0, end=None, extended=False):
+    """Lazily decode all frames in a part of a buffer. Each frame is decoded with :func:`hdlc.hdlc.decode_frame`
+    directly from the buffer, only the bytes of the frame itself are copied. Data before the first flag byte
+    and an unterminated frame at the end are skipped.
+
+    :param buffer: Buffer containing encoded frames, e.g. bytes or a memory mapped file.
+    :type buffer: bytes
+    :param start: Offset into the buffer where decoding starts.
+    :type start: int
+    :param end: Offset into the buffer where decoding ends, a flag byte at the offset is included.
+        Default is the end of the buffer.
+    :type end: int
+    :param extended: If the extended (modulo 128) sequence numbering is used.
+    :type extended: bool
+
+    :returns: Tuples of the offset of the opening flag in the buffer, the information data, the frame and
+        the checksum validity. The information data includes the checksum bytes if the frame is not valid.
+    :rtype: generator
+    """
+    end = len(buffer) if end is None else min(end + 1, len(buffer))
+    index = buffer.find(_FLAG_BYTES, start, end)
+
+    while index >= 0:
+        next_index = buffer.find(_FLAG_BYTES, index + 1, end)
+
+        if next_index < 0:
+            break
+
+        if next_index > index + 1:
+            segment = buffer[index:next_index + 1]
+            information = bytearray(len(segment))
+            frame_end, information_length, frame, valid = decode_frame(segment, len(segment), information, extended)
+
+            if frame is not None:
+                yield (index, bytes(information[0:information_length]), frame, valid)
+
+        index = next_index
+
+def decode_chunk(buffer, start=0, end=None, extended=False):
+    """Decode all frames in a part of a buffer, see :func:`hdlc.bulk.iter_frames`.
+
+    :returns: Tuples of the offset of the opening flag in the buffer, the information data, the frame and
+        the checksum validity.
+    :rtype: list
+    """
+    return list(iter_frames(buffer, start, end, extended))
+
+def _decode_file_chunk(arguments):
+    path, start, end, extended = arguments
+
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return decode_chunk(mapped, start, end, extended)
+
+def decode_file(path, processes=None, chunk_length=1 << 24, extended=False):
+    """Decode a capture file containing raw HDLC traffic in parallel. The file is split at flag bytes into
+    chunks decoded by a pool of processes, each process maps the file and decodes its chunk on its own.
+
+    :param path: Path of the capture file.
+    :type path: str
+    :param processes: Number of processes to use. Default is the number of CPUs.
+    :type processes: int
+    :param chunk_length: Approximate number of bytes decoded by a process at a time.
+    :type chunk_length: int
+    :param extended: If the extended (modulo 128) sequence numbering is used.
+    :type extended: bool
+
+    :returns: Tuples of the offset of the opening flag in the file, the information data, the frame and
+        the checksum validity, in file order. See :func:`hdlc.bulk.decode_chunk`.
+    :rtype: generator
+
+    :raises:
+        - :class:`ValueError` - If the chunk length is not positive.
+    """
+    if chunk_length <= 0:
+        raise ValueError('Invalid chunk length')
+
+    with open(path, 'rb') as file:
+        if file.seek(0, 2) == 0:
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            chunks = [(path, start, end, extended) for start, end in split(mapped, chunk_length)]
+
+    with multiprocessing.Pool(processes) as pool:
+        # Results are returned in submission order, merging the chunks back in file order
+        for frames in pool.imap(_decode_file_chunk, chunks):
+            yield from frames
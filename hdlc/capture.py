@@ -0,0 +1,291 @@
+import io
+import mmap
+import os
+import struct
+import time
+
+from .bulk import iter_frames
+from .hdlc import Receiver
+
+#: Data received from the remote node.
+DIRECTION_RECEIVED = 0
+#: Data sent to the remote node.
+DIRECTION_SENT = 1
+
+_MAGIC = b'HDLC\x01'
+# Timestamp in microseconds, direction and data length
+_RECORD = struct.Struct('<QBI')
+# Timestamp in microseconds and offset of the record in the data file
+_INDEX = struct.Struct('<QQ')
+
+def _index_path(path):
+    return str(path) + '.idx'
+
+def _map(file):
+    # Empty files can not be mapped
+    if file.seek(0, 2) == 0:
+        return b''
+
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+def decode_capture(path, extended=False):
+    """Decode a raw capture file, e.g. bytes read from a serial port and written to a file as is. The file
+    is memory mapped and frames are decoded directly from the mapped region, so files larger than the
+    available memory can be decoded. See :func:`hdlc.bulk.decode_file` for decoding in parallel.
+
+    :param path: Path of the capture file.
+    :type path: str
+    :param extended: If the extended (modulo 128) sequence numbering is used.
+    :type extended: bool
+
+    :returns: Tuples of the offset of the opening flag in the file, the information data, the frame and
+        the checksum validity, see :func:`hdlc.bulk.iter_frames`.
+    :rtype: generator
+    """
+    with open(path, 'rb') as file:
+        mapped = _map(file)
+
+        try:
+            yield from iter_frames(mapped, 0, None, extended)
+        finally:
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+
+class Recorder:
+    """Append-only recorder of the data exchanged on a link, e.g. the data written to a receiver and read
+    from a sender created by :func:`hdlc.protocol`. Every call to :meth:`hdlc.capture.Recorder.record`
+    appends a record with a timestamp, the direction and the data to the file. An index with a fixed size
+    entry per record is kept in a second file with the ``.idx`` suffix, allowing the records to be read in
+    any order with :class:`hdlc.capture.Capture`. Index entries are written once the records they point to
+    have been flushed, so a capture can be read while it is being recorded.
+
+    :param path: Path of the capture file. Records are appended if the file exists.
+    :type path: str
+    """
+    def __init__(self, path):
+        self._file = open(path, 'ab')
+        self._index = open(_index_path(path), 'ab')
+        # Index entries of records which may not have reached the capture file yet
+        self._entries = bytearray()
+
+        if self._file.tell() == 0:
+            self._file.write(_MAGIC)
+            self._file.flush()
+
+        self._offset = self._file.tell()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def record(self, direction, buffer, offset=0, length=None, timestamp=None):
+        """Append a record to the capture.
+
+        :param direction: Either :const:`hdlc.capture.DIRECTION_RECEIVED` or :const:`hdlc.capture.DIRECTION_SENT`.
+        :type direction: int
+        :param buffer: Buffer containing the data.
+        :type buffer: bytes
+        :param offset: Offset into the buffer.
+        :type offset: int
+        :param length: Number of bytes to record. Default is the rest of the buffer.
+        :type length: int
+        :param timestamp: Time in seconds since the epoch. Default is the current time.
+        :type timestamp: float
+        """
+        length = len(buffer) - offset if length is None else length
+        timestamp = time.time() if timestamp is None else timestamp
+        timestamp_us = int(round(timestamp * 1000000))
+
+        self._file.write(_RECORD.pack(timestamp_us, direction, length))
+        self._file.write(memoryview(buffer)[offset:offset + length])
+        self._entries += _INDEX.pack(timestamp_us, self._offset)
+        self._offset += _RECORD.size + length
+
+        if len(self._entries) >= io.DEFAULT_BUFFER_SIZE:
+            self._write_entries()
+
+    def flush(self):
+        """Flush recorded data to the file system.
+        """
+        self._write_entries()
+        self._index.flush()
+
+    def close(self):
+        """Close the capture files.
+        """
+        self._write_entries()
+        self._file.close()
+        self._index.close()
+
+    def _write_entries(self):
+        # The records are flushed first, a record without an entry is ignored when reading
+        self._file.flush()
+        self._index.write(self._entries)
+        self._entries = bytearray()
+
+class Capture:
+    """Reader of a capture written by :class:`hdlc.capture.Recorder`. Both files are memory mapped, records
+    are read without loading the capture into memory and can be looked up by number or by time. Records
+    recorded after the capture was opened are not included, neither are index entries pointing past the
+    end of the capture file.
+
+    :param path: Path of the capture file.
+    :type path: str
+
+    :raises:
+        - :class:`ValueError` - If the file is not a capture file.
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as file, open(_index_path(path), 'rb') as index:
+            self._data = _map(file)
+            self._index = _map(index)
+
+        if self._data[0:len(_MAGIC)] != _MAGIC:
+            self.close()
+            raise ValueError('Not a capture file')
+
+        self._length = len(self._index) // _INDEX.size
+
+        # Entries are in file order, only entries at the end can point to truncated records
+        while self._length > 0 and not self._complete(self._length - 1):
+            self._length -= 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, number):
+        """Read a record.
+
+        :param number: Record number.
+        :type number: int
+
+        :returns: The timestamp in seconds, the direction and the data. The data is copied from the mapped
+            file, only the record itself is read.
+        :rtype: tuple
+        """
+        if number < 0:
+            number += len(self)
+
+        if number < 0 or number >= len(self):
+            raise IndexError('Record number out of range')
+
+        timestamp_us, offset = _INDEX.unpack_from(self._index, number * _INDEX.size)
+        timestamp_us, direction, length = _RECORD.unpack_from(self._data, offset)
+        offset += _RECORD.size
+        return (timestamp_us / 1000000, direction, self._data[offset:offset + length])
+
+    def find(self, timestamp):
+        """Find the first record at or after a point in time.
+
+        :param timestamp: Time in seconds since the epoch.
+        :type timestamp: float
+
+        :returns: The record number. Equal to the number of records if all records are older.
+        :rtype: int
+        """
+        timestamp_us = int(round(timestamp * 1000000))
+        low = 0
+        high = len(self)
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if _INDEX.unpack_from(self._index, middle * _INDEX.size)[0] < timestamp_us:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def _complete(self, number):
+        offset = _INDEX.unpack_from(self._index, number * _INDEX.size)[1]
+
+        if offset + _RECORD.size > len(self._data):
+            return False
+
+        return offset + _RECORD.size + _RECORD.unpack_from(self._data, offset)[2] <= len(self._data)
+
+    def iter_frames(self, direction, start=0, stop=None, buffer_length=4096, extended=False):
+        """Decode the frames sent in one direction. The data of the records is decoded as a stream, a frame
+        may span several records.
+
+        :param direction: Either :const:`hdlc.capture.DIRECTION_RECEIVED` or :const:`hdlc.capture.DIRECTION_SENT`.
+        :type direction: int
+        :param start: Number of the first record to decode, e.g. found with :meth:`hdlc.capture.Capture.find`.
+        :type start: int
+        :param stop: Number of the record after the last record to decode. Default is all records.
+        :type stop: int
+        :param buffer_length: Length of the receiver buffer, frames longer than this are skipped.
+        :type buffer_length: int
+        :param extended: If the extended (modulo 128) sequence numbering is used.
+        :type extended: bool
+
+        :returns: Tuples of the timestamp of the record completing the frame, the information data, the frame
+            and the checksum validity.
+        :rtype: generator
+        """
+        receiver = Receiver(buffer_length, extended)
+        stop = len(self) if stop is None else min(stop, len(self))
+
+        for number in range(start, stop):
+            timestamp, record_direction, data = self[number]
+
+            if record_direction == direction:
+                for information, frame, valid in receiver.iter_frames((data,)):
+                    yield (timestamp, information, frame, valid)
+
+    def close(self):
+        """Close the capture files.
+        """
+        for mapped in (self._data, self._index):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+
+def reindex(path):
+    """Rebuild the index of a capture written by :class:`hdlc.capture.Recorder`, e.g. if the index file is
+    lost or a record was written without its index entry. A truncated record at the end is ignored.
+
+    :param path: Path of the capture file.
+    :type path: str
+
+    :returns: The number of indexed records.
+    :rtype: int
+
+    :raises:
+        - :class:`ValueError` - If the file is not a capture file.
+    """
+    count = 0
+
+    with open(path, 'rb') as file:
+        data = _map(file)
+
+        try:
+            if data[0:len(_MAGIC)] != _MAGIC:
+                raise ValueError('Not a capture file')
+
+            with open(_index_path(path) + '.tmp', 'wb') as index:
+                offset = len(_MAGIC)
+
+                while offset + _RECORD.size <= len(data):
+                    timestamp_us, direction, length = _RECORD.unpack_from(data, offset)
+
+                    if offset + _RECORD.size + length > len(data):
+                        break
+
+                    index.write(_INDEX.pack(timestamp_us, offset))
+                    offset += _RECORD.size + length
+                    count += 1
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    os.replace(_index_path(path) + '.tmp', _index_path(path))
+    return count
@@ -1,4 +1,10 @@
-import heapq
+import sys
+
+try:
+    from binascii import crc_hqx as _crc_hqx
+except ImportError:
+    # E.g. MicroPython, the table based implementation is used instead
+    _crc_hqx = None
 
 #: Information frame type.
 FRAME_INFORMATION = 0
@@ -11,12 +17,12 @@ FRAME_UNNUMBERED = 2
 SUPERVISORY_RECEIVE_READY = 0x00
 #: Receive not ready supervisory type (currently unused).
 SUPERVISORY_RECEIVE_NOT_READY = 0x02
-#: Reject supervisory type. Sent in response to an observered sequence number gap
-#: or invalid information frame. Requesting all information frames
-#: starting from the specified sequence number to be resent (currently unused).
+#: Reject supervisory type. Sent in response to an observered sequence number gap.
+#: Requesting all information frames starting from the specified sequence number to be resent.
 SUPERVISORY_REJECT = 0x01
-#: Selective reject supervisory type. Same usage as with :const:`hdlc.SUPERVISORY_REJECT` but
-#: only requests the specific information frame to be resent.
+#: Selective reject supervisory type. Sent in response to an invalid information frame.
+#: Same usage as with :const:`hdlc.SUPERVISORY_REJECT` but only requests the specific
+#: information frame to be resent.
 SUPERVISORY_SELECTIVE_REJECT = 0x03
 
 #: Disconnected mode. Sent by the slave when in disconnected mode (default mode on startup)
@@ -28,6 +34,9 @@ UNNUMBERED_ACKNOWLEDGE = 0x0C
 UNNUMBERED_SET_NORMAL_RESPONSE_MODE = 0x08
 UNNUMBERED_SET_ASYNCHRONOUS_RESPONSE_MODE = 0x07
 UNNUMBERED_SET_ASYNCHRONOUS_BALANCED_MODE = 0x07
+UNNUMBERED_SET_NORMAL_RESPONSE_MODE_EXTENDED = 0x1B
+UNNUMBERED_SET_ASYNCHRONOUS_RESPONSE_MODE_EXTENDED = 0x0F
+UNNUMBERED_SET_ASYNCHRONOUS_BALANCED_MODE_EXTENDED = 0x0F
 UNNUMBERED_DISCONNECT = 0x04
 UNNUMBERED_REQUEST_DISCONNECT = 0x04
 UNNUMBERED_SET_INITIALIZATION_MODE = 0x09
@@ -43,6 +52,8 @@ _BUFFER_0 = bytearray(0)
 
 _FLAG_BYTE = 0x7E
 _ESCAPE_BYTE = 0x7D
+_FLAG_BYTES = b'\x7E'
+_ESCAPE_BYTES = b'\x7D'
 _FCS_INITIAL = 0xFFFF
 _FCS_TARGET = 0xF0B8
 
@@ -84,16 +95,75 @@ _CRC16_TABLE = (
 def crc16(acc, value):
     return (acc >> 8) ^ (_CRC16_TABLE[(acc ^ value) & 0xFF])
 
-def copy(source, destination, source_offset, destination_offset, length):
-    for i in range(length):
-        destination[destination_offset + i] = source[source_offset + i]
+def _fcs16_table(buffer, offset, length, acc=_FCS_INITIAL):
+    table = _CRC16_TABLE
+
+    for i in range(offset, offset + length):
+        acc = (acc >> 8) ^ table[(acc ^ buffer[i]) & 0xFF]
+
+    return acc
+
+def _reflect_byte(value):
+    result = 0
+
+    for _ in range(8):
+        result = (result << 1) | (value & 0x01)
+        value >>= 1
+
+    return result
+
+# The HDLC FCS-16 is the bit reflected form of the CRC-CCITT computed by binascii.crc_hqx. Reflecting
+# the bits of every data byte and of the accumulator before and after gives the same result.
+_REFLECT_TABLE = bytes(_reflect_byte(i) for i in range(256)) if _crc_hqx is not None else None
+
+def _reflect16(value):
+    return (_REFLECT_TABLE[value & 0xFF] << 8) | _REFLECT_TABLE[value >> 8]
+
+def _fcs16_native(buffer, offset, length, acc=_FCS_INITIAL):
+    data = bytes(memoryview(buffer)[offset:offset + length]).translate(_REFLECT_TABLE)
+
+    return _reflect16(_crc_hqx(data, _reflect16(acc)))
+
+#: Calculate the FCS-16 of ``length`` bytes of ``buffer`` starting at ``offset``. Equivalent to calling
+#: :func:`crc16` for every byte with ``acc`` as the initial value.
+fcs16 = _fcs16_native if _crc_hqx is not None else _fcs16_table
+
+def _copy_loop(source, destination, source_offset, destination_offset, length):
+    if source is destination and destination_offset > source_offset:
+        # Copy backwards so overlapping ranges are not overwritten before being read
+        for i in range(length - 1, -1, -1):
+            destination[destination_offset + i] = source[source_offset + i]
+    else:
+        for i in range(length):
+            destination[destination_offset + i] = source[source_offset + i]
+
+def _copy_slice(source, destination, source_offset, destination_offset, length):
+    if length <= 0:
+        return
 
-def heappop(heap, i):
-    item = heap[i]
-    heap[i] = heap[-1]
-    heap.pop()
-    heapq.heapify(heap)
-    return item
+    source_end = source_offset + length
+    destination_end = destination_offset + length
+
+    if source_end > len(source) or destination_end > len(destination):
+        raise IndexError('Copy out of range')
+
+    # Slice assignment between memoryviews is a single memmove, overlapping ranges are handled
+    memoryview(destination)[destination_offset:destination_end] = memoryview(source)[source_offset:source_end]
+
+def _has_slice_assignment():
+    try:
+        buffer = bytearray(2)
+        memoryview(buffer)[0:1] = memoryview(b'\x01')[0:1]
+        return buffer[0] == 1
+    except Exception:
+        # E.g. MicroPython ports built without slice assignment support
+        return False
+
+copy = _copy_slice if _has_slice_assignment() else _copy_loop
+
+# Byte stuffing is done on whole runs of data using the bytes methods (find, split and replace).
+# MicroPython uses the per byte loops instead.
+_FAST_CODEC = sys.implementation.name != 'micropython'
 
 class Frame:
     """Base class for specific frame types. All frames have address and the poll-final
@@ -119,15 +189,16 @@ class IFrame(Frame):
 
     :ivar address: 8-bit frame address.
     :vartype address: int
-    :ivar receive_sequence_number: 3-bit receive sequence number used to acknowledge receipt of
-        information frames. All frames with sequence number up to but not including this value
-        are acknowledged to have been received (currently unused).
+    :ivar receive_sequence_number: 3-bit (7-bit in extended mode) receive sequence number used to acknowledge
+        receipt of information frames. All frames with sequence number up to but not including this value
+        are acknowledged to have been received.
     :vartype receive_sequence_number: int
     :ivar poll_final: 1-bit poll/final value. Set to true by master when requesting a response from a slave
         node or when slave has finished transmitting.
     :vartype poll_final: bool
-    :ivar send_sequence_number: 3-bit send sequence number used to assure ordering of information frames. It should
-        be incremented (modulo 8) for every successive information frame.
+    :ivar send_sequence_number: 3-bit (7-bit in extended mode) send sequence number used to assure ordering of
+        information frames. It should be incremented (modulo 8, or 128 in extended mode) for every successive
+        information frame.
     :vartype send_sequence_number: int
     :ivar frame_type: Frame type value, always :const:`hdlc.FRAME_INFORMATION`.
     :vartype frame_type: int
@@ -147,9 +218,9 @@ class SFrame(Frame):
 
     :ivar address: 8-bit frame address.
     :vartype address: int
-    :ivar receive_sequence_number: 3-bit receive sequence number used to acknowledge receipt of
-        information frames. All frames with sequence number up to but not including this value
-        are acknowledged to have been received (currently unused).
+    :ivar receive_sequence_number: 3-bit (7-bit in extended mode) receive sequence number used to acknowledge
+        receipt of information frames. All frames with sequence number up to but not including this value
+        are acknowledged to have been received.
     :vartype receive_sequence_number: int
     :ivar poll_final: 1-bit poll/final value. Set to true by master when requesting a response from a slave
         node or when slave has finished transmitting.
@@ -200,7 +271,7 @@ def escape(value, buffer, offset):
     buffer[offset] = value
     return 1
 
-def encode_frame(frame, buffer, offset, length, frame_buffer):
+def encode_frame(frame, buffer, offset, length, frame_buffer, extended=False):
     frame_index = 1
     fcs = _FCS_INITIAL
 
@@ -210,15 +281,26 @@ def encode_frame(frame, buffer, offset, length, frame_buffer):
     fcs = crc16(fcs, value)
     frame_index += escape(value, frame_buffer, frame_index)
 
-    value = encode_control(frame)
+    control = encode_control(frame, extended)
+
+    value = control & 0xFF
     fcs = crc16(fcs, value)
     frame_index += escape(value, frame_buffer, frame_index)
 
-    for i in range(length):
-        value = buffer[offset + i]
+    if extended and frame.frame_type != FRAME_UNNUMBERED:
+        value = control >> 8
         fcs = crc16(fcs, value)
         frame_index += escape(value, frame_buffer, frame_index)
 
+    if _FAST_CODEC:
+        fcs = fcs16(buffer, offset, length, fcs)
+        frame_index = _escape_bulk(buffer, offset, length, frame_buffer, frame_index)
+    else:
+        for i in range(length):
+            value = buffer[offset + i]
+            fcs = crc16(fcs, value)
+            frame_index += escape(value, frame_buffer, frame_index)
+
     fcs ^= 0xFFFF
 
     value = fcs & 0xFF
@@ -231,10 +313,52 @@ def encode_frame(frame, buffer, offset, length, frame_buffer):
 
     return frame_index + 1
 
-def encode_control(frame):
+def _escape_bulk(buffer, offset, length, frame_buffer, frame_index):
+    data = bytes(memoryview(buffer)[offset:offset + length])
+
+    if _ESCAPE_BYTES in data or _FLAG_BYTES in data:
+        # The escape byte must be replaced first
+        data = data.replace(_ESCAPE_BYTES, b'\x7D\x5D').replace(_FLAG_BYTES, b'\x7D\x5E')
+
+    copy(data, frame_buffer, 0, frame_index, len(data))
+    return frame_index + len(data)
+
+def _unescape_bulk(data, escape):
+    # Returns the unescaped data and if the data ended with an escape byte
+    parts = data.split(_ESCAPE_BYTES)
+
+    if len(parts) == 1 and not escape:
+        return data, False
+
+    result = bytearray()
+
+    for i, part in enumerate(parts):
+        if i > 0:
+            escape = True
+
+        if escape and len(part) > 0:
+            result.append(part[0] ^ 0x20)
+            result += part[1:]
+            escape = False
+        else:
+            result += part
+
+    return result, escape
+
+def encode_control(frame, extended=False):
     value = 0
 
-    if frame.frame_type == FRAME_INFORMATION:
+    if extended and frame.frame_type == FRAME_INFORMATION:
+        # Two byte control field with 7-bit sequence numbers, the first byte is sent first
+        value |= (frame.receive_sequence_number & 0x7F) << 9
+        value |= (1 if frame.poll_final else 0) << 8
+        value |= (frame.send_sequence_number & 0x7F) << 1
+    elif extended and frame.frame_type == FRAME_SUPERVISORY:
+        value |= (frame.receive_sequence_number & 0x7F) << 9
+        value |= (1 if frame.poll_final else 0) << 8
+        value |= (frame.supervisory_type & 0x03) << 2
+        value |= 0x01
+    elif frame.frame_type == FRAME_INFORMATION:
         value |= (frame.receive_sequence_number & 0x07) << 5
         value |= (1 if frame.poll_final else 0) << 4
         value |= (frame.send_sequence_number & 0x07) << 1
@@ -251,13 +375,19 @@ def encode_control(frame):
 
     return value
 
-def decode_frame(buffer, length, information_buffer):
+def decode_frame(buffer, length, information_buffer, extended=False):
+    if _FAST_CODEC:
+        return _decode_frame_bulk(buffer, length, information_buffer, extended)
+
     information_index = 0
     frame_start_index = -1
     frame_end_index = -1
     control_escape = False
     fcs = _FCS_INITIAL
     frame = None
+    count = 0
+    address = 0
+    control = 0
 
     for i in range(length):
         if frame_start_index < 0:
@@ -281,24 +411,77 @@ def decode_frame(buffer, length, information_buffer):
 
                 fcs = crc16(fcs, value)
 
-                if i == frame_start_index + 2:
-                    address = buffer[frame_start_index + 1]
-                    frame = decode_control(address, value)
-                elif i > frame_start_index + 2:
+                if count == 0:
+                    address = value
+                elif count == 1:
+                    control = value
+
+                    if not extended or value & 0x03 == 0x03:
+                        frame = decode_control(address, control)
+                elif frame is None:
+                    frame = decode_control(address, control | (value << 8), True)
+                else:
                     information_buffer[information_index] = value
                     information_index += 1
 
+                count += 1
+
     if frame_start_index < 0:
         return (length, 0, None, False)
     elif frame_end_index < 0:
         return (0, 0, None, False)
-    elif frame_start_index + 4 > frame_end_index or control_escape or fcs != _FCS_TARGET:
+    elif frame is None or information_index < 2 or control_escape or fcs != _FCS_TARGET:
+        return (frame_end_index, information_index, frame, False)
+    else:
+        return (frame_end_index, information_index - 2, frame, True)
+
+def _decode_frame_bulk(buffer, length, information_buffer, extended):
+    frame_start_index = buffer.find(_FLAG_BYTES, 0, length)
+
+    if frame_start_index < 0:
+        return (length, 0, None, False)
+
+    # Consecutive flags are skipped
+    while frame_start_index < length - 1 and buffer[frame_start_index + 1] == _FLAG_BYTE:
+        frame_start_index += 1
+
+    frame_end_index = buffer.find(_FLAG_BYTES, frame_start_index + 1, length)
+
+    if frame_end_index < 0:
+        return (0, 0, None, False)
+
+    data, control_escape = _unescape_bulk(buffer[frame_start_index + 1:frame_end_index], False)
+    fcs = fcs16(data, 0, len(data))
+    frame = None
+    header_length = 2
+
+    if len(data) >= 2:
+        if not extended or data[1] & 0x03 == 0x03:
+            frame = decode_control(data[0], data[1])
+        elif len(data) >= 3:
+            header_length = 3
+            frame = decode_control(data[0], data[1] | (data[2] << 8), True)
+
+    information_index = len(data) - header_length if frame is not None else 0
+    copy(data, information_buffer, header_length, 0, information_index)
+
+    if frame is None or information_index < 2 or control_escape or fcs != _FCS_TARGET:
         return (frame_end_index, information_index, frame, False)
     else:
         return (frame_end_index, information_index - 2, frame, True)
 
-def decode_control(address, value):
-    if value & 0x01 == 0:
+def decode_control(address, value, extended=False):
+    if extended and value & 0x01 == 0:
+        receive_sequence_number = (value >> 9) & 0x7F
+        poll_final = True if (value >> 8) & 0x01 == 1 else False
+        send_sequence_number = (value >> 1) & 0x7F
+        return IFrame(address, receive_sequence_number, poll_final, send_sequence_number)
+    elif extended and value & 0x02 == 0:
+        receive_sequence_number = (value >> 9) & 0x7F
+        poll_final = True if (value >> 8) & 0x01 == 1 else False
+        supervisory_type = (value >> 2) & 0x03
+        return SFrame(address, receive_sequence_number, poll_final, supervisory_type)
+    elif value & 0x01 == 0:
         receive_sequence_number = (value >> 5) & 0x07
         poll_final = True if (value >> 4) & 0x01 == 1 else False
         send_sequence_number = (value >> 1) & 0x07
@@ -313,16 +496,31 @@ def decode_control(address, value):
         poll_final = True if (value >> 4) & 0x01 == 1 else False
         return UFrame(address, unnumbered_type, poll_final)
 
-def to_unnumbered_type(mode):
+def to_unnumbered_type(mode, extended=False):
     if mode == NORMAL_RESPONSE_MODE:
-        return UNNUMBERED_SET_NORMAL_RESPONSE_MODE
+        return UNNUMBERED_SET_NORMAL_RESPONSE_MODE_EXTENDED if extended else UNNUMBERED_SET_NORMAL_RESPONSE_MODE
     elif mode == ASYNCHRONOUS_RESPONSE_MODE:
-        return UNNUMBERED_SET_ASYNCHRONOUS_RESPONSE_MODE
+        return (UNNUMBERED_SET_ASYNCHRONOUS_RESPONSE_MODE_EXTENDED if extended
+            else UNNUMBERED_SET_ASYNCHRONOUS_RESPONSE_MODE)
     elif mode == ASYNCHRONOUS_BALANCED_MODE:
-        return UNNUMBERED_SET_ASYNCHRONOUS_BALANCED_MODE
+        return (UNNUMBERED_SET_ASYNCHRONOUS_BALANCED_MODE_EXTENDED if extended
+            else UNNUMBERED_SET_ASYNCHRONOUS_BALANCED_MODE)
 
     raise ValueError('Unknown operation mode')
 
+def _is_set_mode(unnumbered_type, extended):
+    if extended:
+        return (unnumbered_type == UNNUMBERED_SET_NORMAL_RESPONSE_MODE_EXTENDED
+            or unnumbered_type == UNNUMBERED_SET_ASYNCHRONOUS_RESPONSE_MODE_EXTENDED
+            or unnumbered_type == UNNUMBERED_SET_ASYNCHRONOUS_BALANCED_MODE_EXTENDED)
+
+    return (unnumbered_type == UNNUMBERED_SET_NORMAL_RESPONSE_MODE
+        or unnumbered_type == UNNUMBERED_SET_ASYNCHRONOUS_RESPONSE_MODE
+        or unnumbered_type == UNNUMBERED_SET_ASYNCHRONOUS_BALANCED_MODE)
+
+def _is_acknowledge(frame):
+    return frame.frame_type == FRAME_SUPERVISORY and frame.supervisory_type == SUPERVISORY_RECEIVE_READY
+
 class HdlcError(Exception):
     """Base class for all HDLC errors.
     """
@@ -331,8 +529,13 @@ class HdlcError(Exception):
 class TimeoutError(HdlcError):
     """Error raised by the :meth:`hdlc.Sender.read` method if a message failed to be
     sent within the timeout period and retry limit.
+
+    :ivar frame: The frame which was not acknowledged. The frame has been removed from the sender.
+    :vartype frame: :class:`hdlc.Frame`
     """
-    pass
+    def __init__(self, message, frame=None):
+        super().__init__(message)
+        self.frame = frame
 
 class Receiver:
     """Class responsible for decoding HDLC frames. Raw data containing the encoded frames
@@ -341,15 +544,32 @@ class Receiver:
     sequences are ignored but care should be taken not to write beyond the size of the
     internal buffer. Check available space with :attr:`hdlc.Receiver.available_length`.
 
+    Frames are decoded incrementally. The scan position, escape state, checksum and the unescaped
+    data of a partially received frame are kept between calls, so every written byte is only
+    processed once regardless of how the frame is split across writes.
+
+    The internal buffer is used as a circular buffer. Consuming a decoded frame only advances the
+    head index, the remaining data is never moved.
+
     :param buffer_length: Number of bytes to allocate for the internal buffer.
     :type buffer_length: int
+    :param extended: If information and supervisory frames use the extended two byte control field
+        with 7-bit sequence numbers.
+    :type extended: bool
 
     :ivar length: Total number of bytes currently in the internal buffer.
     :vartype length: int
     """
-    def __init__(self, buffer_length=128):
+    def __init__(self, buffer_length=128, extended=False):
         self.buffer = bytearray(buffer_length)
         self.length = 0
+        self.extended = extended
+        self._information = bytearray(buffer_length)
+        self._head = 0
+        self._scan_index = 0
+        self._start_index = -1
+        self._end_index = -1
+        self._begin_frame()
 
     @property
     def available_length(self):
@@ -360,7 +580,18 @@ class Receiver:
     def reset(self):
         """Reset internal state to initial values. Discards any pending data.
         """
+        Receiver.clear(self)
+
+    def clear(self):
+        """Discard any pending data in the internal buffer. Unlike :meth:`hdlc.Receiver.reset` the state
+        of a subclass is kept, e.g. the handshake and sequence numbers of a :class:`hdlc.ProtocolReceiver`.
+        """
         self.length = 0
+        self._head = 0
+        self._scan_index = 0
+        self._start_index = -1
+        self._end_index = -1
+        self._begin_frame()
 
     def write(self, buffer, offset=0, length=None):
         """Write the raw data to the internal buffer. The decoded frame is made available
@@ -382,7 +613,15 @@ class Receiver:
         if length > self.available_length:
             raise ValueError('Buffer length exceeded')
 
-        copy(buffer, self.buffer, offset, self.length, length)
+        if length == 0:
+            return
+
+        capacity = len(self.buffer)
+        tail = (self._head + self.length) % capacity
+        first_length = min(length, capacity - tail)
+
+        copy(buffer, self.buffer, offset, tail, first_length)
+        copy(buffer, self.buffer, offset + first_length, 0, length - first_length)
         self.length += length
 
     def read_frame(self, information_buffer):
@@ -397,20 +636,353 @@ class Receiver:
             if there was not enough data to decode a whole frame.
         :rtype: tuple(int, :class:`hdlc.Frame`, bool)
         """
+        information_length, frame, valid = self._next_frame()
+
+        if frame is not None:
+            copy(self._payload(information_length), information_buffer, 0, 0, information_length)
+            self._pop_frame()
+
+        return (information_length, frame, valid)
+
+    def read_frame_view(self):
+        """Read decoded frame from head of the internal buffer without copying the information data.
+        Data can be added by calling :meth:`hdlc.Receiver.write` method.
+
+        The information data is only copied when it had to be unescaped or wraps around the end of
+        the internal buffer, otherwise the returned view refers directly to the received data.
+
+        :returns: A tuple of length three containing a memoryview of the information data, the decoded
+            frame and a boolean indicating if the checksum is valid. The memoryview is only valid until
+            the next call to a read or write method. The view and frame entries are None if there
+            was not enough data to decode a whole frame.
+        :rtype: tuple(memoryview, :class:`hdlc.Frame`, bool)
+        """
+        information_length, frame, valid = self._next_frame()
+
+        if frame is None:
+            return (None, None, False)
+
+        view = self._payload(information_length)
+        self._pop_frame()
+        return (view, frame, valid)
+
+    def iter_frames(self, chunks):
+        """Decode frames from an iterable of raw data chunks, e.g. read from a file, pipe or socket.
+        Chunks are consumed lazily and written to the internal buffer as space allows, so memory use
+        is bounded by the buffer length regardless of the amount of data. Frames which do not fit
+        in the internal buffer are dropped.
+
+        :param chunks: Iterable of raw data chunks.
+        :type chunks: iterable
+
+        Subclasses validate and handle the frames the same way as in their read methods and only yield
+        the frames passed on to the caller, e.g. information frames with the expected sequence number.
+
+        :returns: Generator yielding a tuple of length three for every decoded frame containing the
+            information data, the decoded frame and a boolean indicating if the checksum is valid.
+        :rtype: generator
+        """
+        for chunk in chunks:
+            offset = 0
+
+            while offset < len(chunk):
+                length = min(len(chunk) - offset, self.available_length)
+                self.write(chunk, offset, length)
+                offset += length
+
+                while True:
+                    view, frame, valid = self._read_accepted()
+
+                    if frame is None:
+                        break
+
+                    yield (bytes(view), frame, valid)
+
+                if self.available_length == 0:
+                    # The buffer is filled by a single frame, only the buffered data is dropped
+                    self.clear()
+
+    def read_view(self):
+        """Read the information part of the decoded frame at the head of the internal buffer without
+        copying it. Data can be added by calling :meth:`hdlc.Receiver.write` method.
+
+        By default this method raises a :class:`NotImplementedError` and it is up to a subclass
+        to provide an implementation.
+
+        :returns: A memoryview of the information data, only valid until the next call to a read or write
+            method. None if there is no frame.
+        :rtype: memoryview
+        """
+        raise NotImplementedError()
+
+    def read_frames(self, information_buffer, offsets, lengths, frames=None):
+        """Read the information part of every decoded frame in the internal buffer in a single call.
+        The information data is stored back to back in the provided buffer. Data can be added by calling
+        :meth:`hdlc.Receiver.write` method. Frames with an invalid checksum are skipped.
+
+        Subclasses validate and handle the frames the same way as in their read methods, but a single
+        acknowledge with the latest receive sequence number is pushed to the sender for all received
+        information frames.
+
+        :param information_buffer: Writable buffer used to store the information data of the decoded frames.
+            Reading stops at a frame which does not fit in the remaining space, the frame is kept for the
+            next call.
+        :type information_buffer: bytes
+        :param offsets: Writable sequence, e.g. a list or an array, where the offset of the information data
+            of each frame is stored. The length of the sequence limits the number of frames read.
+        :type offsets: list
+        :param lengths: Writable sequence where the length of the information data of each frame is stored.
+            Must be at least as long as offsets.
+        :type lengths: list
+        :param frames: Optional writable sequence where each decoded frame is stored. Must be at least as
+            long as offsets.
+        :type frames: list
+
+        :returns: The number of frames stored in the provided buffer.
+        :rtype: int
+        """
+        count = 0
+        offset = 0
+
+        while count < len(offsets):
+            information_length, frame, valid = self._next_frame()
+
+            if frame is None:
+                break
+
+            if valid and self._accepts(frame, valid):
+                if offset + information_length > len(information_buffer):
+                    break
+
+                copy(self._payload(information_length), information_buffer, 0, offset, information_length)
+                offsets[count] = offset
+                lengths[count] = information_length
+
+                if frames is not None:
+                    frames[count] = frame
+
+                offset += information_length
+                count += 1
+
+            self._pop_frame()
+            self._handle_frame(frame, valid)
+
+        self._flush_acknowledge()
+        return count
+
+    def _read_accepted(self):
+        # Handle frames up to the next frame passed on to the caller, the view is None if there is none
         while True:
-            discard_length, information_length, frame, valid = decode_frame(
-                self.buffer, self.length, information_buffer)
+            information_length, frame, valid = self._next_frame()
+
+            if frame is None:
+                return (None, None, False)
+
+            accepted = self._accepts(frame, valid)
+            view = self._payload(information_length) if accepted else None
+
+            self._pop_frame()
+            self._handle_frame(frame, valid)
+            self._flush_acknowledge()
+
+            if accepted:
+                return (view, frame, valid)
 
-            if discard_length > 0:
-                self.length = self.length - discard_length
-                copy(self.buffer, self.buffer, discard_length, 0, self.length)
+    def _accepts(self, frame, valid):
+        # If the information data of the frame is passed on to the caller
+        return True
 
-            if frame is not None:
-                return (information_length, frame, valid)
+    def _handle_frame(self, frame, valid):
+        # Called for every decoded frame after it has been removed from the buffer
+        pass
+
+    def _flush_acknowledge(self):
+        # Called after handling frames, letting the sender acknowledge the frames received so far
+        pass
+
+    def _next_frame(self):
+        # Decode up to the next complete frame, junk between frames is discarded. The frame stays
+        # at the head of the buffer, its information data in the internal information buffer,
+        # until it is consumed by calling _pop_frame.
+        while self._end_index < 0:
+            end_index = self._scan_frame()
+
+            if end_index < 0:
+                if self._start_index < 0:
+                    # No frame start found, everything scanned so far can be discarded
+                    self._discard(self.length)
+                elif self._start_index > 0:
+                    # Data before the frame start is discarded to make room for the rest of the frame
+                    self._discard(self._start_index)
 
-            if discard_length == 0:
                 return (0, None, False)
 
+            self._end_index = end_index
+
+            if self._frame is None:
+                self._pop_frame()
+
+        frame = self._frame
+        information_length = self._information_length
+        valid = information_length >= 2 and not self._escape and self._fcs == _FCS_TARGET
+
+        if valid:
+            information_length -= 2
+
+        return (information_length, frame, valid)
+
+    def _payload(self, length):
+        if self._raw and self._raw_offset >= 0:
+            return memoryview(self.buffer)[self._raw_offset:self._raw_offset + length]
+        else:
+            return memoryview(self._information)[0:length]
+
+    def _pop_frame(self):
+        # The closing flag is kept as the opening flag of the next frame
+        self._discard(self._end_index)
+        self._start_index = 0
+        self._end_index = -1
+        self._begin_frame()
+
+    def _begin_frame(self):
+        self._escape = False
+        self._fcs = _FCS_INITIAL
+        self._count = 0
+        self._address = 0
+        self._control = 0
+        self._frame = None
+        self._information_length = 0
+        # If the information data is still in the buffer starting at the raw offset
+        self._raw = True
+        self._raw_offset = -1
+
+    def _discard(self, length):
+        self.length -= length
+        self._scan_index -= length
+
+        if self.length == 0:
+            self._head = 0
+        else:
+            self._head = (self._head + length) % len(self.buffer)
+
+        if self._start_index >= 0:
+            self._start_index -= length
+
+    def _scan_frame(self):
+        # Continue decoding from where the previous call stopped. Returns the index, relative
+        # to the head, of the closing flag if a whole frame has been scanned, otherwise -1.
+        if not _FAST_CODEC:
+            self._raw = False
+            return self._scan_frame_loop(False)
+
+        # The frame start and header are found byte by byte, the information
+        # part is unescaped in runs up to the next flag.
+        end_index = self._scan_frame_loop(True)
+
+        if end_index >= 0 or self._frame is None:
+            return end_index
+
+        buffer = self.buffer
+        capacity = len(buffer)
+
+        if self._raw and self._raw_offset < 0:
+            self._raw_offset = (self._head + self._scan_index) % capacity
+
+        while self._scan_index < self.length:
+            position = (self._head + self._scan_index) % capacity
+            segment_end = min(capacity, position + self.length - self._scan_index)
+            flag_index = buffer.find(_FLAG_BYTES, position, segment_end)
+            run_end = segment_end if flag_index < 0 else flag_index
+
+            if (self._raw and not self._escape and position == self._raw_offset + self._information_length
+                    and buffer.find(_ESCAPE_BYTES, position, run_end) < 0):
+                # Information data is left in place as long as nothing is escaped and it does not wrap
+                length = run_end - position
+                self._fcs = fcs16(buffer, position, length, self._fcs)
+            else:
+                if self._raw:
+                    copy(buffer, self._information, self._raw_offset, 0, self._information_length)
+                    self._raw = False
+
+                data, self._escape = _unescape_bulk(buffer[position:run_end], self._escape)
+                length = len(data)
+                self._fcs = fcs16(data, 0, length, self._fcs)
+                copy(data, self._information, 0, self._information_length, length)
+
+            self._information_length += length
+            self._count += length
+            self._scan_index += run_end - position
+
+            if flag_index >= 0:
+                self._scan_index += 1
+                return self._scan_index - 1
+
+        return -1
+
+    def _scan_frame_loop(self, header_only):
+        buffer = self.buffer
+        capacity = len(buffer)
+        information = self._information
+        extended = self.extended
+        escape = self._escape
+        fcs = self._fcs
+        count = self._count
+        frame = self._frame
+        information_length = self._information_length
+        end_index = -1
+        i = self._scan_index
+        position = (self._head + i) % capacity if capacity > 0 else 0
+
+        while i < self.length and not (header_only and frame is not None):
+            value = buffer[position]
+            i += 1
+            position += 1
+
+            if position == capacity:
+                position = 0
+
+            if self._start_index < 0 or (value == _FLAG_BYTE and count == 0):
+                if value == _FLAG_BYTE:
+                    # Start of frame, consecutive flags are skipped
+                    self._start_index = i - 1
+                    escape = False
+                    fcs = _FCS_INITIAL
+            elif value == _FLAG_BYTE:
+                end_index = i - 1
+                break
+            elif value == _ESCAPE_BYTE:
+                escape = True
+            else:
+                if escape:
+                    escape = False
+                    value = value ^ 0x20
+
+                fcs = crc16(fcs, value)
+
+                if count == 0:
+                    self._address = value
+                elif count == 1:
+                    self._control = value
+
+                    if not extended or value & 0x03 == 0x03:
+                        frame = decode_control(self._address, value)
+                elif frame is None:
+                    frame = decode_control(self._address, self._control | (value << 8), True)
+                else:
+                    information[information_length] = value
+                    information_length += 1
+
+                count += 1
+
+        self._scan_index = i
+        self._escape = escape
+        self._fcs = fcs
+        self._count = count
+        self._frame = frame
+        self._information_length = information_length
+
+        return end_index
+
     def read(self, information_buffer):
         """Read the information part of the decoded frame at the head of the internal buffer.
         Data can be added by calling :meth:`hdlc.Receiver.write` method.
@@ -434,7 +1006,8 @@ class ProtocolReceiver(Receiver):
     A slave node stays in disconnected mode until it recieves a handshake message from the master and
     enters normal operation mode. In disconnected mode the slave responds to all messages with a
     unnumbered frame of type :const:`hdlc.UNNUMBERED_DISCONNECTED_MODE`. The handshake may be sent at
-    any time and will reset the internal state of the slave node to initial values.
+    any time and will reset the internal state of the slave node to initial values. A receive ready frame
+    with the poll bit set is answered with a receive ready frame, or an information frame if data is queued.
 
     A master node stays in disconnected mode until it receives a unnumbered acknowledge frame
     from the slave. No supplied data will flow out until the handshake is complete.
@@ -452,6 +1025,15 @@ class ProtocolReceiver(Receiver):
     :type mode: int
     :param buffer_length: Number of bytes to allocate for the internal buffer.
     :type buffer_length: int
+    :param extended: If the extended (modulo 128) sequence numbering should be used. The handshake
+        is performed with the extended set mode commands.
+    :type extended: bool
+    :param acknowledge_frames: Number of received information frames after which an acknowledge is sent.
+    :type acknowledge_frames: int
+    :param acknowledge_delay_ms: Maximum time an acknowledge is delayed waiting for more information frames,
+        counted from the first unacknowledged frame. Zero sends an acknowledge for every read. The delay should
+        be well below the write timeout of the remote node.
+    :type acknowledge_delay_ms: int
 
     :ivar length: Total number of bytes currently in the internal buffer.
     :vartype length: int
@@ -459,22 +1041,32 @@ class ProtocolReceiver(Receiver):
         using information frames.
     :vartype initialized: bool
     """
-    def __init__(self, sender, master, address, mode, buffer_length=128):
-        super().__init__(buffer_length)
+    def __init__(self, sender, master, address, mode, buffer_length=128, extended=False, acknowledge_frames=1,
+            acknowledge_delay_ms=0):
+        super().__init__(buffer_length, extended)
         self.sender = sender
         self.master = master
         self.address = address
         self.mode = mode
+        self.acknowledge_frames = acknowledge_frames
+        self.acknowledge_delay_ms = acknowledge_delay_ms
         self.sequence_number = 0
         self.initialized = False
+        self._rejected = None
+        self._acknowledge = None
+        self._acknowledge_count = 0
 
         if master:
-            sender.write_frame(UFrame(address, to_unnumbered_type(mode), True), priority=3, retry=True)
+            sender.write_frame(UFrame(address, to_unnumbered_type(mode, extended), True), priority=3, retry=True)
 
     def reset(self):
         super().reset()
         self.sequence_number = 0
         self.initialized = False
+        self._rejected = None
+        self._acknowledge = None
+        self._acknowledge_count = 0
+        self.sender.receive_sequence_number = 0
 
     def read(self, information_buffer):
         """Read the information part of the decoded frame at the head of the internal buffer.
@@ -483,7 +1075,16 @@ class ProtocolReceiver(Receiver):
         This implementaiton makes sure the checksum is valid and that the received frame has the
         correct sequence number and address. This method might push frames to the sender depending
         on the received data. E.g. an acknowledge frame (a supervisory ready frame) will be added when
-        a valid information frame is received.
+        a valid information frame is received, possibly delayed according to the acknowledge_frames and
+        acknowledge_delay_ms settings. The acknowledge is dropped by the sender if an information
+        frame carrying the same receive sequence number is sent first. The receive sequence number of
+        incoming information frames is handled as an acknowledge.
+
+        A gap in the received sequence numbers is answered with a reject frame and an invalid information
+        frame with a selective reject frame. Only one reject is sent until the expected frame is received,
+        except that a selective reject is followed by a reject if a later frame is received, as frames are
+        not kept out of sequence.
+        Received reject frames make the sender resend the requested frames without waiting for the timeout.
 
         :param information_buffer: Writable buffer used to store the information data of the decoded frame.
         :type information_buffer: bytes
@@ -491,85 +1092,359 @@ class ProtocolReceiver(Receiver):
         :returns: The number of bytes stored in the provided information buffer.
         :rtype: int
         """
-        while True:
-            information_length, frame, valid = self.read_frame(information_buffer)
+        view = self.read_view()
 
-            if frame is None:
-                return 0
-
-            if frame.address == self.address:
-                if not self.initialized and self.master:
-                    if (frame.frame_type == FRAME_UNNUMBERED
-                            and frame.unnumbered_type == UNNUMBERED_ACKNOWLEDGE and valid):
-                        self.sender.remove_unnumbered_frame(to_unnumbered_type(self.mode))
-                        self.initialized = True
-                elif (frame.frame_type == FRAME_UNNUMBERED
-                        and (frame.unnumbered_type == UNNUMBERED_SET_NORMAL_RESPONSE_MODE
-                            or frame.unnumbered_type == UNNUMBERED_SET_ASYNCHRONOUS_RESPONSE_MODE
-                            or frame.unnumbered_type == UNNUMBERED_SET_ASYNCHRONOUS_BALANCED_MODE)
-                        and valid):
-                    self.reset()
-                    self.sender.reset()
-                    self.sender.write_frame(UFrame(frame.address, UNNUMBERED_ACKNOWLEDGE, True), priority=1)
-                    self.initialized = True
-                elif not self.initialized:
-                    if valid:
-                        self.sender.write_frame(UFrame(frame.address, UNNUMBERED_DISCONNECTED_MODE, True), priority=1)
-                elif (frame.frame_type == FRAME_SUPERVISORY
-                        and frame.supervisory_type == SUPERVISORY_RECEIVE_READY and valid):
-                    self.sender.remove_information_frame(frame.receive_sequence_number)
-                elif (frame.frame_type == FRAME_SUPERVISORY
-                        and frame.supervisory_type == SUPERVISORY_SELECTIVE_REJECT and valid):
-                    # The frame will be resent after timeout is reached
-                    pass
-                elif frame.frame_type == FRAME_INFORMATION:
-                    if valid and frame.send_sequence_number == self.sequence_number:
-                        self.sequence_number = (self.sequence_number + 1) % 8
-                        response_frame = SFrame(frame.address, self.sequence_number, False, SUPERVISORY_RECEIVE_READY)
-                    else:
-                        response_frame = SFrame(frame.address, self.sequence_number, True, SUPERVISORY_SELECTIVE_REJECT)
-                        information_length = 0
-
-                    self.sender.write_frame(response_frame, priority=1)
-                    return information_length
+        if view is None:
+            return 0
+
+        copy(view, information_buffer, 0, 0, len(view))
+        return len(view)
+
+    def read_view(self):
+        """Read the information part of the decoded frame at the head of the internal buffer without
+        copying it. Frames are validated and handled the same way as in the :meth:`hdlc.ProtocolReceiver.read`
+        method.
+
+        :returns: A memoryview of the information data, only valid until the next call to a read or write
+            method. None if there is no frame.
+        :rtype: memoryview
+        """
+        return self._read_accepted()[0]
+
+    def _accepts(self, frame, valid):
+        # If the information data of the frame is passed on to the caller
+        return (valid and self.initialized and frame.address == self.address
+            and frame.frame_type == FRAME_INFORMATION and frame.send_sequence_number == self.sequence_number)
+
+    def _handle_frame(self, frame, valid):
+        if frame.address != self.address:
+            return
+
+        if not self.initialized and self.master:
+            if (frame.frame_type == FRAME_UNNUMBERED
+                    and frame.unnumbered_type == UNNUMBERED_ACKNOWLEDGE and valid):
+                self.sender.remove_unnumbered_frame(to_unnumbered_type(self.mode, self.extended))
+                self.initialized = True
+        elif (frame.frame_type == FRAME_UNNUMBERED
+                and _is_set_mode(frame.unnumbered_type, self.extended)
+                and valid):
+            self.reset()
+            self.sender.reset()
+            self.sender.write_frame(UFrame(frame.address, UNNUMBERED_ACKNOWLEDGE, True), priority=1)
+            self.initialized = True
+        elif not self.initialized:
+            if valid:
+                self.sender.write_frame(UFrame(frame.address, UNNUMBERED_DISCONNECTED_MODE, True), priority=1)
+        elif (frame.frame_type == FRAME_SUPERVISORY
+                and frame.supervisory_type == SUPERVISORY_RECEIVE_READY and valid):
+            self.sender.remove_information_frame(frame.receive_sequence_number)
+
+            if frame.poll_final and not self.master:
+                # Poll from the master, answered with the current receive state unless data is sent
+                self.sender.acknowledge(frame.address)
+        elif (frame.frame_type == FRAME_SUPERVISORY
+                and frame.supervisory_type == SUPERVISORY_SELECTIVE_REJECT and valid):
+            self.sender.resend_information_frame(frame.receive_sequence_number)
+        elif (frame.frame_type == FRAME_SUPERVISORY
+                and frame.supervisory_type == SUPERVISORY_REJECT and valid):
+            self.sender.resend_information_frames(frame.receive_sequence_number)
+        elif frame.frame_type == FRAME_INFORMATION:
+            if valid:
+                self.sender.remove_information_frame(frame.receive_sequence_number)
+
+            if valid and frame.send_sequence_number == self.sequence_number:
+                self.sequence_number = (self.sequence_number + 1) % (128 if self.extended else 8)
+                self.sender.receive_sequence_number = self.sequence_number
+                self._rejected = None
+                self._acknowledge = frame.address
+                self._acknowledge_count += 1
+            elif self._rejected is None or (valid and self._rejected == SUPERVISORY_SELECTIVE_REJECT):
+                # A valid frame following a selective reject means the frames after the invalid one were
+                # dropped as well, they are requested with a reject instead of waiting for the timeout
+                supervisory_type = SUPERVISORY_REJECT if valid else SUPERVISORY_SELECTIVE_REJECT
+                self._rejected = supervisory_type
+                self._flush_acknowledge()
+                self.sender.write_frame(
+                    SFrame(frame.address, self.sequence_number, True, supervisory_type), priority=1)
+            elif valid:
+                # Possibly a resent frame which was already received, the acknowledge might
+                # have been lost so it is sent again without delay
+                self._acknowledge = frame.address
+                self._acknowledge_count = max(self._acknowledge_count, self.acknowledge_frames)
+
+    def _flush_acknowledge(self):
+        # Let the sender acknowledge the frames received so far according to the delay settings
+        if self._acknowledge is not None:
+            self.sender.acknowledge(self._acknowledge, self._acknowledge_count, self.acknowledge_frames,
+                self.acknowledge_delay_ms)
+            self._acknowledge = None
+            self._acknowledge_count = 0
 
 class Sender:
-    """Class responsible for encoding HDLC frames.
+    """Class responsible for encoding HDLC frames. Retryable information frames are sent using
+    a sliding window, up to the configured number of frames may be sent before an acknowledge is
+    required from the remote node. Every sent frame has its own timer and is resent independently
+    when the timeout is reached.
+
+    :param buffer_length: Number of bytes to allocate for the internal buffer.
+    :type buffer_length: int
+    :param write_retries: Number of times to retry a frame after the initial write.
+    :type write_retries: int
+    :param write_timeout_ms: Time to wait for an acknowledge before resending a retryable frame.
+    :type write_timeout_ms: int
+    :param window_size: Maximum number of retryable information frames which can be sent
+        without being acknowledged. Must be between 1 and 7, or 127 in extended mode.
+    :type window_size: int
+    :param extended: If information and supervisory frames use the extended two byte control field
+        with 7-bit sequence numbers.
+    :type extended: bool
+    :param cache_length: Maximum number of bytes used to keep encoded retryable frames, which are
+        reused when the frames are resent. Default is twice the buffer length.
+    :type cache_length: int
+
+    :ivar length: Total number of bytes currently in the internal buffer.
+    :vartype length: int
+    :ivar receive_sequence_number: Receive sequence number included in information frames written without
+        an explicit receive sequence number. The value is read every time such a frame is sent, acknowledging
+        the received frames on the same frame as the outgoing data.
+    :vartype receive_sequence_number: int
+    :ivar cache_hits: Number of retryable frames read using the previously encoded frame.
+    :vartype cache_hits: int
+    :ivar cache_misses: Number of retryable frames which had to be encoded when read.
+    :vartype cache_misses: int
+    :ivar generation: Incremented every time the sender is reset. A frame which is no longer held and was
+        written in an earlier generation was discarded by a reset, unless it was acknowledged before it.
+    :vartype generation: int
     """
     class _WriteItem:
-        def __init__(self, offset, length, frame, priority, retry):
+        def __init__(self, offset, length, frame, priority, retry, stamp):
             self.offset = offset
             self.length = length
             self.frame = frame
             self.priority = priority
             self.retry = retry
-            self.age_ms = 0
+            self.stamp = stamp
+            self.deadline_ms = 0
             self.write_count = 0
+            self.encoded = None
+            self.encoded_key = None
+            # Write count when a selective reject requested the frame, None if not requested
+            self.selected_count = None
+            self.piggyback = frame.frame_type == FRAME_INFORMATION and frame.receive_sequence_number is None
 
         def __lt__(self, other):
-            return -self.priority < -other.priority
+            # Frames with the same priority are sent in the order they were written
+            return (self.priority > other.priority
+                or (self.priority == other.priority and self.stamp < other.stamp))
+
+    class _Queue:
+        # Binary heap keeping track of the position of every item, allowing any item
+        # to be removed or moved after its sort key has changed in O(log n) time.
+        def __init__(self, less):
+            self._less = less
+            self._items = []
+            self._positions = {}
+
+        def __len__(self):
+            return len(self._items)
+
+        def __iter__(self):
+            return iter(self._items)
+
+        def first(self):
+            return self._items[0] if len(self._items) > 0 else None
+
+        def push(self, item):
+            self._items.append(item)
+            self._sift_up(len(self._items) - 1)
+
+        def pop(self):
+            item = self._items[0]
+            self.remove(item)
+            return item
+
+        def remove(self, item):
+            index = self._positions.pop(item)
+            last = self._items.pop()
+
+            if last is not item:
+                self._items[index] = last
+                self._positions[last] = index
+                self.update(last)
+
+        def update(self, item):
+            self._sift_down(self._sift_up(self._positions[item]))
+
+        def _sift_up(self, index):
+            items = self._items
+            item = items[index]
+
+            while index > 0:
+                parent = (index - 1) >> 1
+
+                if not self._less(item, items[parent]):
+                    break
+
+                items[index] = items[parent]
+                self._positions[items[index]] = index
+                index = parent
+
+            items[index] = item
+            self._positions[item] = index
+            return index
 
-    def __init__(self, buffer_length=128, write_retries=1, write_timeout_ms=500):
+        def _sift_down(self, index):
+            items = self._items
+            count = len(items)
+            item = items[index]
+
+            while True:
+                child = 2 * index + 1
+
+                if child >= count:
+                    break
+
+                if child + 1 < count and self._less(items[child + 1], items[child]):
+                    child += 1
+
+                if not self._less(items[child], item):
+                    break
+
+                items[index] = items[child]
+                self._positions[items[index]] = index
+                index = child
+
+            items[index] = item
+            self._positions[item] = index
+            return index
+
+    def __init__(self, buffer_length=128, write_retries=1, write_timeout_ms=500, window_size=1, extended=False,
+            cache_length=None):
+        self.modulus = 128 if extended else 8
+
+        if window_size < 1 or window_size >= self.modulus:
+            raise ValueError('Invalid window size')
+
+        self.extended = extended
         self.write_retries = write_retries
         self.write_timeout_ms = write_timeout_ms
+        self.window_size = window_size
+        self.cache_length = 2 * buffer_length if cache_length is None else cache_length
+        self.cache_hits = 0
+        self.cache_misses = 0
         self.buffer = bytearray(buffer_length)
-        self.length = 0
-        self.frames = []
-        self.sequence_number = 0
+        self.generation = 0
+        self.reset()
 
     @property
     def available_length(self):
-        """Available space in the internal data buffer.
+        """Available space in the internal data buffer. The space of a removed frame is reclaimed
+        once all frames written before it have been removed as well.
         """
-        return len(self.buffer) - self.length
+        return len(self.buffer) - self._used_length()
+
+    @property
+    def frame_buffer_length(self):
+        """Length of a frame buffer large enough for any single frame, with every byte of a full internal
+        buffer escaped.
+        """
+        return 2 * len(self.buffer) + 16
+
+    @property
+    def frames(self):
+        """List of frames held by the sender. Includes both frames waiting to be read and
+        retryable frames which have been read but not yet acknowledged.
+        """
+        return list(self._timers) + list(self._pending) + list(self._queue)
+
+    @property
+    def timeout_ms(self):
+        """Time in milliseconds, counted from the last call to :meth:`hdlc.Sender.read`, until a sent frame
+        is due to be resent or a delayed acknowledge is queued. None if there is nothing waiting. Can be used
+        to schedule the next call instead of reading periodically.
+        """
+        deadlines = [delayed[1] for delayed in self._delayed.values()]
+        due = self._timers.first()
+
+        if due is not None:
+            deadlines.append(due.deadline_ms)
+
+        if len(deadlines) == 0:
+            return None
+
+        return max(0, min(deadlines) - self._time_ms)
+
+    def holds(self, frame):
+        """Check if a frame is held by the sender, i.e. waiting to be read or, if retryable, waiting to be
+        acknowledged. A frame is no longer held once it has been acknowledged or has reached the retry limit.
+
+        :param frame: A frame returned by :meth:`hdlc.Sender.write` or :meth:`hdlc.Sender.write_frame`.
+        :type frame: :class:`hdlc.Frame`
+
+        :returns: True if the frame is held.
+        :rtype: bool
+        """
+        return frame in self._held
+
+    def settle(self, waiters):
+        """Split frames waited on by the caller, e.g. until the remote node has acknowledged them, by their
+        state in the sender.
+
+        :param waiters: Tuples of a frame returned by :meth:`hdlc.Sender.write`, the :attr:`hdlc.Sender.generation`
+            when the frame was written and a value identifying the waiter.
+        :type waiters: list
+
+        :returns: A tuple of length three containing the tuples of the frames which are still held, the values
+            of the frames which have been acknowledged and the values of the frames which were discarded when
+            the sender was reset, e.g. by a new handshake.
+        :rtype: tuple(list, list, list)
+        """
+        held = []
+        acknowledged = []
+        dropped = []
+
+        for waiter in waiters:
+            if self.holds(waiter[0]):
+                held.append(waiter)
+            elif waiter[1] == self.generation:
+                acknowledged.append(waiter[2])
+            else:
+                dropped.append(waiter[2])
+
+        return held, acknowledged, dropped
 
     def reset(self):
-        """Reset internal state to initial values. Discards pending frames and
-        resets the outgoing sequence number.
+        """Reset internal state to initial values. Discards pending frames,
+        resets the outgoing sequence number and increments the generation.
         """
+        self.generation += 1
         self.length = 0
-        self.frames = []
         self.sequence_number = 0
+        self.receive_sequence_number = 0
+        self._tail = 0
+        self._cached_length = 0
+        self._time_ms = 0
+        self._stamp = 0
+        # Frames waiting to be sent, retryable information frames are kept in write order
+        self._queue = Sender._Queue(lambda a, b: a < b)
+        self._pending = Sender._Queue(lambda a, b: a.stamp < b.stamp)
+        # Receive ready frames waiting to be sent by address
+        self._acknowledges = {}
+        # Delayed receive ready frames by address, holding the number of unacknowledged frames and the deadline
+        self._delayed = {}
+        # All held frames
+        self._held = {}
+        # Sent retryable frames ordered by when they are due to be resent
+        self._timers = Sender._Queue(lambda a, b: a.deadline_ms < b.deadline_ms
+            or (a.deadline_ms == b.deadline_ms and a.stamp < b.stamp))
+        # Sent retryable frames other than information frames, highest priority first
+        self._blocking = Sender._Queue(lambda a, b: a.priority > b.priority)
+        # Sent retryable frames by send sequence number and unnumbered type
+        self._information = {}
+        self._unnumbered = {}
+        # Frames with a payload in the buffer in write order, the payloads are stored in
+        # a ring starting at the oldest frame and ending at the tail.
+        self._allocations = Sender._Queue(lambda a, b: a.stamp < b.stamp)
 
     def write_frame(self, frame, buffer=_BUFFER_0, offset=0, length=None, priority=0, retry=False):
         """Write data to the internal buffer and queue provided frame. The encoded frame is made available
@@ -587,11 +1462,14 @@ class Sender:
             before frames with lower priority when calling the :meth:`hdlc.Sender.read` method.
         :type priority: int
         :param retry: If the frame should be held in queue after it has been read. Frames need to
-            be explicitly removed otherwise they stay in the queue indefinitly. A high priority frame
-            which is retryable will block the head of the queue untill it is removed or a higher
-            priority frame is added.
+            be explicitly removed otherwise they stay in the queue indefinitly. A retryable information
+            frame occupies a slot in the send window until it is removed. Any other retryable frame
+            blocks frames with the same or lower priority untill it is removed.
         :type retry: bool
 
+        :returns: The queued frame.
+        :rtype: :class:`hdlc.Frame`
+
         :raises:
             - :class:`ValueError` - If there is no more space in the internal buffer.
         """
@@ -601,9 +1479,29 @@ class Sender:
         if length > self.available_length:
             raise ValueError('Buffer length exceeded')
 
-        copy(buffer, self.buffer, offset, self.length, length)
-        heapq.heappush(self.frames, Sender._WriteItem(self.length, length, frame, priority, retry))
-        self.length += length
+        item = Sender._WriteItem(self._tail, length, frame, priority, retry, self._stamp)
+        self._stamp += 1
+        self._held[frame] = item
+
+        if length > 0:
+            # The payload is split in two when it does not fit before the end of the buffer
+            first_length = min(length, len(self.buffer) - self._tail)
+            copy(buffer, self.buffer, offset, self._tail, first_length)
+            copy(buffer, self.buffer, offset + first_length, 0, length - first_length)
+            self._tail = (self._tail + length) % len(self.buffer)
+            self.length += length
+            self._allocations.push(item)
+
+        if retry and frame.frame_type == FRAME_INFORMATION:
+            # Numbered frames are kept in write order
+            self._pending.push(item)
+        else:
+            self._queue.push(item)
+
+            if not retry and _is_acknowledge(frame):
+                self._acknowledges.setdefault(frame.address, []).append(item)
+
+        return frame
 
     def write(self, buffer, offset=0, length=None, address=0xFF, receive_sequence_number=0, poll_final=True):
         """Write data to the internal buffer. The data is queued up as information frames and is
@@ -619,23 +1517,30 @@ class Sender:
         :type address: int
         :param receive_sequence_number: The acknowledge sequence number to include in the information frame.
             The HDLC protocol specifies providing a receive sequence number of n confirms all previous n - 1
-            frames have been received.
+            frames have been received. If None the :attr:`hdlc.Sender.receive_sequence_number` value at the
+            time the frame is sent is used instead and any pending receive ready frame is dropped.
         :type receive_sequence_number: int
         :param poll_final: If the poll-final bit should be set in the information frame. In the HDLC protocol the
             bit is used as a flag to indicate that a slave node is allowed to transmit data.
         :type poll_final: bool
 
+        :returns: The queued information frame.
+        :rtype: :class:`hdlc.IFrame`
+
         :raises:
             - :class:`ValueError` - If there is no more space in the internal buffer.
         """
         frame = IFrame(address, receive_sequence_number, poll_final, self.sequence_number)
-        self.sequence_number = (self.sequence_number + 1) % 8
+        self.sequence_number = (self.sequence_number + 1) % self.modulus
         return self.write_frame(frame, buffer, offset, length, 0, True)
 
     def read(self, frame_buffer, delta_ms=0):
         """Read encoded frame from head of the internal queue. The frame can be queued by calling the :meth:`hdlc.Sender.write`
         method. The same frame may be returned multiple times if it is retryable.
 
+        New information frames are returned as long as there is room in the send window. Sent frames
+        which have reached the timeout are returned again before any new frames of the same or lower priority.
+
         :param frame_buffer: Writable buffer used to store the frame in. In worst case every byte in frame
             needs to be escaped requiring double the amount of space to store the raw data plus additional
             6 bytes for the framing bytes. The length property holds the number of pending bytes and
@@ -651,79 +1556,389 @@ class Sender:
         :raises:
             - :class:`hdlc.TimeoutError` - If a message failed to be sent within the timeout period and retry limit.
         """
-        if len(self.frames) > 0:
-            item = self.frames[0]
+        self._advance(delta_ms)
+        item = self._peek_item()
 
-            if item.write_count == 0:
-                item.write_count += 1
-            else:
-                item.age_ms += delta_ms
+        if item is None:
+            return 0
 
-                if item.age_ms < self.write_timeout_ms:
-                    return 0
-                else:
-                    item.age_ms = 0
-                    item.write_count += 1
+        self._take_item(item)
+        frame_length = self._encode_item(item, frame_buffer)
+        self._sent_item(item)
+        return frame_length
 
-            if item.write_count > self.write_retries + 1:
-                self._remove_frame(0)
-                raise TimeoutError('Did not receive ack within timeout')
+    def read_many(self, frame_buffer, delta_ms=0, max_frames=None):
+        """Read as many encoded frames as fit in the provided buffer, allowing the queue to be drained
+        with a single write to the transport. Consecutive frames share the flag between them. Frames are
+        returned in the same order and with the same rules as the :meth:`hdlc.Sender.read` method.
+
+        :param frame_buffer: Writable buffer used to store the frames in. A frame which does not fit in the
+            remaining space is left in the queue.
+        :type frame_buffer: bytes
+        :param delta_ms: Number of milliseconds elapsed since the last call to this method or
+            the :meth:`hdlc.Sender.read` method.
+        :type delta_ms: int
+        :param max_frames: Maximum number of frames to read. Default is no limit.
+        :type max_frames: int
+
+        :returns: The number of bytes stored in the provided frame buffer.
+        :rtype: int
 
-            frame_length = encode_frame(item.frame, self.buffer, item.offset, item.length, frame_buffer)
+        :raises:
+            - :class:`hdlc.TimeoutError` - If the first frame failed to be sent within the timeout period and
+              retry limit. A later frame reaching the retry limit ends the batch and raises on the next call instead.
+            - :class:`ValueError` - If the first frame does not fit in the provided buffer. The frame is left
+              in the queue.
+        """
+        self._advance(delta_ms)
+        frame_buffer = memoryview(frame_buffer)
+        length = 0
+        count = 0
+
+        while max_frames is None or count < max_frames:
+            item = self._peek_item()
+
+            if item is None or (count > 0 and item.write_count > self.write_retries):
+                break
 
-            if not item.retry:
-                self._remove_frame(0)
+            # The opening flag overwrites the closing flag of the previous frame
+            offset = length - 1 if count > 0 else 0
 
+            try:
+                frame_length = self._encode_item(item, frame_buffer[offset:])
+            except IndexError:
+                if count == 0:
+                    # Nothing would ever be read, the frame would neither be sent nor time out
+                    raise ValueError('Frame buffer too small')
+
+                break
+
+            self._take_item(item)
+            self._sent_item(item)
+            length = offset + frame_length
+            count += 1
+
+        return length
+
+    def drain(self, frame_buffer, write, delta_ms=0):
+        """Read all frames which are ready to be sent with the :meth:`hdlc.Sender.read_many` method and pass
+        them on in batches. An information frame reaching the retry limit does not stop the remaining frames
+        from being sent.
+
+        :param frame_buffer: Writable buffer used to store the frames in, at least
+            :attr:`hdlc.Sender.frame_buffer_length` bytes long.
+        :type frame_buffer: bytes
+        :param write: Called with the bytes of every batch of frames, e.g. the write method of a transport.
+        :type write: callable
+        :param delta_ms: Number of milliseconds elapsed since the last call to a read method.
+        :type delta_ms: int
+
+        :returns: The errors of the information frames which reached the retry limit.
+        :rtype: list
+
+        :raises:
+            - :class:`hdlc.TimeoutError` - If any other frame, e.g. the handshake, reached the retry limit.
+        """
+        errors = []
+
+        while True:
+            try:
+                read = self.read_many(frame_buffer, delta_ms)
+            except TimeoutError as e:
+                if e.frame is None or e.frame.frame_type != FRAME_INFORMATION:
+                    raise
+
+                errors.append(e)
+                continue
+            finally:
+                delta_ms = 0
+
+            if read == 0:
+                return errors
+
+            write(bytes(frame_buffer[0:read]))
+
+    def _encode_item(self, item, frame_buffer):
+        if item.piggyback:
+            item.frame.receive_sequence_number = self.receive_sequence_number
+
+        if not item.retry:
+            return self._encode(item, frame_buffer)
+
+        # The encoded frame is reused as long as the address and control field are unchanged,
+        # the receive sequence number of a piggybacked acknowledge may differ between sends.
+        key = (item.frame.address, encode_control(item.frame, self.extended))
+
+        if item.encoded is not None and item.encoded_key == key:
+            self.cache_hits += 1
+            frame_length = len(item.encoded)
+            copy(item.encoded, frame_buffer, 0, 0, frame_length)
             return frame_length
 
-        return 0
+        frame_length = self._encode(item, frame_buffer)
+        self.cache_misses += 1
+        self._uncache(item)
+
+        if self._cached_length + frame_length <= self.cache_length:
+            item.encoded = bytes(frame_buffer[0:frame_length])
+            item.encoded_key = key
+            self._cached_length += frame_length
+
+        return frame_length
+
+    def acknowledge(self, address, count=1, frames=1, delay_ms=0):
+        """Queue a receive ready frame acknowledging received information frames. The frame is sent with
+        the :attr:`hdlc.Sender.receive_sequence_number` value at the time it is queued. Acknowledges can
+        be delayed to let a single frame acknowledge a burst of received frames. A delayed acknowledge
+        is dropped if an information frame carrying the receive sequence number is sent first.
+
+        :param address: The address to include in the receive ready frame.
+        :type address: int
+        :param count: Number of newly received frames to acknowledge.
+        :type count: int
+        :param frames: Number of unacknowledged frames at which the frame is queued without further delay.
+        :type frames: int
+        :param delay_ms: Maximum time the frame is delayed, counted from the first unacknowledged frame.
+            Time is advanced by the delta_ms argument of the :meth:`hdlc.Sender.read` method.
+            No delay if zero.
+        :type delay_ms: int
+        """
+        delayed = self._delayed.pop(address, None)
+
+        if delayed is None:
+            delayed = [0, self._time_ms + delay_ms]
+
+        delayed[0] += count
+
+        if delay_ms <= 0 or delayed[0] >= frames:
+            self.write_frame(SFrame(address, self.receive_sequence_number, False, SUPERVISORY_RECEIVE_READY),
+                priority=1)
+        else:
+            self._delayed[address] = delayed
 
     def remove_information_frame(self, receive_sequence_number):
-        """Remove information frame with a sequence number previous to the one provided and which has
+        """Remove all information frames with a sequence number previous to the one provided and which have
         been read using the :meth:`hdlc.Sender.read` method at least once. This is usually needed
         when an acknowledge has been received from the remote node and it is no longer necessary to
-        keep the frame in the queue.
+        keep the frames in the queue. As specified by the HDLC protocol a receive sequence number of n
+        acknowledges every outstanding frame up to and including n - 1.
 
-        :param receive_sequence_number: Remove queued information frame with a send sequence number
+        :param receive_sequence_number: Remove queued information frames with a send sequence number
             previous to the one provided.
         :type receive_sequence_number: int
         """
-        for i, item in enumerate(self.frames):
-            if (item.frame.frame_type == FRAME_INFORMATION
-                    and item.write_count > 0
-                    and ((item.frame.send_sequence_number + 1) % 8) == receive_sequence_number):
-                self._remove_frame(i)
-                return
+        send_sequence_number = (receive_sequence_number - 1) % self.modulus
+
+        # Outstanding frames have consecutive sequence numbers, walk back from the acknowledged one
+        while send_sequence_number in self._information:
+            item = self._information.pop(send_sequence_number)
+            self._timers.remove(item)
+            self._release(item)
+            send_sequence_number = (send_sequence_number - 1) % self.modulus
+
+    def resend_information_frame(self, send_sequence_number):
+        """Resend the information frame with the provided sequence number on the next call to the
+        :meth:`hdlc.Sender.read` method without waiting for the timeout. The frame must have been read
+        at least once and not yet been removed. Usually needed when a selective reject has been received
+        from the remote node. The resend counts towards the retry limit.
+
+        :param send_sequence_number: Send sequence number of the frame to resend.
+        :type send_sequence_number: int
+        """
+        item = self._information.get(send_sequence_number)
+
+        if item is not None:
+            item.selected_count = item.write_count
+            self._expire(item)
+
+    def resend_information_frames(self, receive_sequence_number):
+        """Remove information frames with a sequence number previous to the one provided and resend all
+        remaining read frames, in the order they were first sent, without waiting for the timeout. Usually
+        needed when a reject has been received from the remote node. The resend counts towards the retry limit.
+
+        :param receive_sequence_number: Send sequence number of the first frame to resend.
+        :type receive_sequence_number: int
+        """
+        self.remove_information_frame(receive_sequence_number)
+
+        for item in self._information.values():
+            if item.selected_count is not None and item.write_count > item.selected_count:
+                # Already resent on a selective reject, the reject is a response to the same loss
+                item.selected_count = None
+                continue
+
+            self._expire(item)
 
     def remove_unnumbered_frame(self, unnumbered_type):
-        for i, item in enumerate(self.frames):
-            if (item.frame.frame_type == FRAME_UNNUMBERED
-                    and item.write_count > 0
-                    and item.frame.unnumbered_type == unnumbered_type):
-                self._remove_frame(i)
-                return
-
-    def _remove_frame(self, i):
-        item = heappop(self.frames, i)
-        self.length = self.length - item.length
-        copy(self.buffer, self.buffer, item.offset + item.length, item.offset, self.length - item.offset)
+        item = self._unnumbered.get(unnumbered_type)
+
+        if item is not None:
+            self._remove_frame(item)
+
+    def _sent_item(self, item):
+        if item.piggyback:
+            self._remove_acknowledge(item.frame.address)
+
+        if not item.retry:
+            self._release(item)
+
+    def _peek_item(self):
+        # Returns the next frame to send without changing any state
+        due = self._timers.first()
+
+        if due is not None and due.deadline_ms > self._time_ms:
+            due = None
+
+        blocking = self._blocking.first()
+        item = self._queue.first()
+        pending = self._pending.first()
+
+        if (pending is not None and len(self._information) < self.window_size
+                and (item is None or pending < item
+                    or (pending.piggyback and pending.frame.address == item.frame.address
+                        and _is_acknowledge(item.frame)))):
+            # An information frame carrying the acknowledge replaces a pending receive ready frame
+            item = pending
+
+        if (item is not None
+                and (due is None or item.priority > due.priority)
+                and (blocking is None or item.priority > blocking.priority)):
+            return item
+
+        return due
+
+    def _take_item(self, item):
+        if item.write_count > 0:
+            # Resent frame which has reached the timeout
+            item.deadline_ms = self._time_ms + self.write_timeout_ms
+            item.write_count += 1
+            self._timers.update(item)
+
+            if item.write_count > self.write_retries + 1:
+                self._remove_frame(item)
+                raise TimeoutError('Did not receive ack within timeout', item.frame)
+
+            return
+
+        if item is self._pending.first():
+            self._pending.pop()
+        else:
+            self._queue.pop()
+
+            if not item.retry and _is_acknowledge(item.frame):
+                self._acknowledges[item.frame.address].remove(item)
+
+        item.write_count += 1
+
+        if item.retry:
+            self._add_outstanding(item)
+
+    def _add_outstanding(self, item):
+        frame = item.frame
+        item.deadline_ms = self._time_ms + self.write_timeout_ms
+        self._timers.push(item)
+
+        if frame.frame_type == FRAME_INFORMATION:
+            self._information[frame.send_sequence_number] = item
+        else:
+            self._blocking.push(item)
+
+            if frame.frame_type == FRAME_UNNUMBERED:
+                self._unnumbered[frame.unnumbered_type] = item
+
+    def _expire(self, item):
+        # Make the frame due to be resent on the next read
+        item.deadline_ms = self._time_ms
+        self._timers.update(item)
+
+    def _advance(self, delta_ms):
+        self._time_ms += delta_ms
+        self._release_acknowledges()
+
+    def _release_acknowledges(self):
+        for address, delayed in list(self._delayed.items()):
+            if delayed[1] <= self._time_ms:
+                self.acknowledge(address, 0)
+
+    def _remove_acknowledge(self, address):
+        self._delayed.pop(address, None)
+
+        for item in self._acknowledges.pop(address, ()):
+            self._queue.remove(item)
+            self._release(item)
+
+    def _remove_frame(self, item):
+        frame = item.frame
+        self._timers.remove(item)
+
+        if frame.frame_type == FRAME_INFORMATION:
+            if self._information.get(frame.send_sequence_number) is item:
+                del self._information[frame.send_sequence_number]
+        else:
+            self._blocking.remove(item)
+
+            if frame.frame_type == FRAME_UNNUMBERED and self._unnumbered.get(frame.unnumbered_type) is item:
+                del self._unnumbered[frame.unnumbered_type]
+
+        self._release(item)
+
+    def _encode(self, item, frame_buffer):
+        buffer = self.buffer
+        offset = item.offset
+
+        if offset + item.length > len(buffer):
+            buffer = buffer[offset:] + buffer[0:offset + item.length - len(buffer)]
+            offset = 0
+
+        return encode_frame(item.frame, buffer, offset, item.length, frame_buffer, self.extended)
+
+    def _uncache(self, item):
+        if item.encoded is not None:
+            self._cached_length -= len(item.encoded)
+            item.encoded = None
+            item.encoded_key = None
+
+    def _release(self, item):
+        self._uncache(item)
+        if self._held.get(item.frame) is item:
+            del self._held[item.frame]
+
+        # Payloads are never moved, the ring shrinks when the oldest payload is released
+        if item.length > 0:
+            self._allocations.remove(item)
+            self.length -= item.length
+
+            if len(self._allocations) == 0:
+                self._tail = 0
+
+    def _used_length(self):
+        # Length of the ring from the oldest payload to the tail, including released payloads in between
+        first = self._allocations.first()
+
+        if first is None:
+            return 0
+
+        return (self._tail - first.offset - 1) % len(self.buffer) + 1
 
 class ProtocolSender(Sender):
     """The :func:`hdlc.protocol` function returns an instance of this class. This class extends
     :class:`hdlc.Sender` and overrides the default address value in the :meth:`hdlc.Sender.write`
-    method to the provided value in the constructor.
+    method to the provided value in the constructor. Information frames are by default sent with
+    the current receive sequence number of the linked :class:`hdlc.ProtocolReceiver`.
     """
-    def __init__(self, address, buffer_length=128, write_retries=1, write_timeout_ms=500):
-        super().__init__(buffer_length, write_retries, write_timeout_ms)
+    def __init__(self, address, buffer_length=128, write_retries=1, write_timeout_ms=500, window_size=1,
+            extended=False, cache_length=None):
+        super().__init__(buffer_length, write_retries, write_timeout_ms, window_size, extended, cache_length)
         self.address = address
 
-    def write(self, buffer, offset=0, length=None, address=None, receive_sequence_number=0, poll_final=True):
+    def write(self, buffer, offset=0, length=None, address=None, receive_sequence_number=None, poll_final=True):
         if address is None:
             address = self.address
 
         return super().write(buffer, offset, length, address, receive_sequence_number, poll_final)
 
-def protocol(master, address, buffer_length=128, write_timeout_ms=500, write_retries=1, mode=NORMAL_RESPONSE_MODE):
+def protocol(master, address, buffer_length=128, write_timeout_ms=500, write_retries=1, mode=NORMAL_RESPONSE_MODE,
+        window_size=1, extended=False, acknowledge_frames=1, acknowledge_delay_ms=0):
     """Create a receiver and sender pair for respectively decoding and encoding HDLC frames.
     The pair is linked, the sender might have queued up messages pending depending on what is written
     to the receiver.
@@ -746,7 +1961,407 @@ def protocol(master, address, buffer_length=128, write_timeout_ms=500, write_ret
     :type write_retries: int
     :param mode: Which link configuration mode to use (currently unused).
     :type mode: int
+    :param window_size: Number of information frames which can be sent before waiting for an acknowledge
+        from the remote node. Must be between 1 and 7, or 127 in extended mode.
+    :type window_size: int
+    :param extended: If the extended (modulo 128) sequence numbering with a two byte control field should
+        be used, allowing larger windows. Both nodes must use the same setting.
+    :type extended: bool
+    :param acknowledge_frames: Number of received information frames acknowledged by a single receive ready
+        frame. Only used together with acknowledge_delay_ms.
+    :type acknowledge_frames: int
+    :param acknowledge_delay_ms: Maximum time to delay the acknowledge of received information frames, counted
+        from the first unacknowledged frame. Zero acknowledges received frames immediately.
+    :type acknowledge_delay_ms: int
     """
-    sender = ProtocolSender(address, buffer_length, write_retries, write_timeout_ms)
-    receiver = ProtocolReceiver(sender, master, address, mode, buffer_length)
+    sender = ProtocolSender(address, buffer_length, write_retries, write_timeout_ms, window_size, extended)
+    receiver = ProtocolReceiver(sender, master, address, mode, buffer_length, extended, acknowledge_frames,
+        acknowledge_delay_ms)
     return receiver, sender
+
+class MultidropReceiver(Receiver):
+    """The :func:`hdlc.multidrop` function returns an instance of this class. A single receiver decodes the
+    frames of all slave nodes sharing the line, each frame is decoded once and dispatched by address to the
+    protocol state of the matching station. Frames from unknown addresses are dropped.
+
+    :param stations: Protocol receivers keyed by slave address. Only the protocol state of the receivers
+        is used, the data is kept in the buffer of this receiver.
+    :type stations: dict
+    :param buffer_length: Number of bytes to allocate for the internal buffer.
+    :type buffer_length: int
+    :param extended: If the extended (modulo 128) sequence numbering is used.
+    :type extended: bool
+
+    :ivar stations: Protocol receivers keyed by slave address, e.g. used to check if the handshake with
+        a slave has been performed.
+    :vartype stations: dict
+    :ivar length: Total number of bytes currently in the internal buffer.
+    :vartype length: int
+    """
+    def __init__(self, stations, buffer_length=128, extended=False):
+        super().__init__(buffer_length, extended)
+        self.stations = stations
+
+    def read(self, information_buffer):
+        """Read the information part of the next decoded frame accepted by any of the stations. Frames are
+        validated and handled per station the same way as in the :meth:`hdlc.ProtocolReceiver.read` method.
+
+        :param information_buffer: Writable buffer used to store the information data of the decoded frame.
+        :type information_buffer: bytes
+
+        :returns: The number of bytes stored in the provided information buffer and the address of the
+            slave which sent the frame. The address is None if there is no frame.
+        :rtype: tuple
+        """
+        view, address = self.read_view()
+
+        if view is None:
+            return 0, None
+
+        copy(view, information_buffer, 0, 0, len(view))
+        return len(view), address
+
+    def read_view(self):
+        """Read the information part of the next decoded frame accepted by any of the stations without
+        copying it.
+
+        :returns: A memoryview of the information data, only valid until the next call to a read or write
+            method, and the address of the slave which sent the frame. Both are None if there is no frame.
+        :rtype: tuple
+        """
+        view, frame, valid = self._read_accepted()
+
+        if frame is None:
+            return None, None
+
+        return view, frame.address
+
+    def _accepts(self, frame, valid):
+        station = self.stations.get(frame.address)
+        return station is not None and station._accepts(frame, valid)
+
+    def _handle_frame(self, frame, valid):
+        station = self.stations.get(frame.address)
+
+        if station is not None:
+            station._handle_frame(frame, valid)
+
+    def _flush_acknowledge(self):
+        for station in self.stations.values():
+            station._flush_acknowledge()
+
+class MultidropSender:
+    """The :func:`hdlc.multidrop` function returns an instance of this class. Shares the line between the
+    senders of all stations, each call to :meth:`hdlc.MultidropSender.read` returns a frame from the station
+    which has the turn. Stations take turns in the order of the addresses, a station without a frame to send
+    is skipped.
+
+    :param senders: Protocol senders keyed by slave address.
+    :type senders: dict
+    :param weighted: If the number of frames sent in a turn is the number of frames waiting in the sender
+        of the station, letting stations with a larger backlog use more of the line. Otherwise a single
+        frame is sent per turn.
+    :type weighted: bool
+    :param poll_interval_ms: Time after which an idle station is polled with a receive ready frame, giving
+        the slave a chance to respond. Default is no polling.
+    :type poll_interval_ms: int
+
+    :ivar senders: Protocol senders keyed by slave address.
+    :vartype senders: dict
+    """
+    def __init__(self, senders, weighted=False, poll_interval_ms=None):
+        self.senders = senders
+        self.weighted = weighted
+        self.poll_interval_ms = poll_interval_ms
+        self._addresses = list(senders)
+        self._turn = 0
+        self._credit = 0
+        self._time_ms = 0
+        self._polled = dict((address, 0) for address in self._addresses)
+
+    @property
+    def timeout_ms(self):
+        """Time in milliseconds, counted from the last call to :meth:`hdlc.MultidropSender.read`, until a
+        frame of any station is due to be resent or a station is due to be polled. None if there is nothing
+        waiting.
+        """
+        timeouts = [sender.timeout_ms for sender in self.senders.values()]
+
+        if self.poll_interval_ms is not None:
+            timeouts.extend(max(0, self._polled[address] + self.poll_interval_ms - self._time_ms)
+                for address in self._addresses)
+
+        timeouts = [timeout for timeout in timeouts if timeout is not None]
+        return min(timeouts) if len(timeouts) > 0 else None
+
+    def write(self, address, buffer, offset=0, length=None):
+        """Write data to be sent in an information frame to a slave.
+
+        :param address: Address of the slave.
+        :type address: int
+        :param buffer: Buffer containing the data to send.
+        :type buffer: bytes
+        :param offset: Offset into the buffer.
+        :type offset: int
+        :param length: Number of bytes to send. Default is the rest of the buffer.
+        :type length: int
+
+        :returns: The queued information frame.
+        :rtype: :class:`hdlc.IFrame`
+
+        :raises:
+            - :class:`KeyError` - If the address is not one of the stations.
+            - :class:`ValueError` - If there is no more space in the internal buffer of the station.
+        """
+        return self.senders[address].write(buffer, offset, length)
+
+    def read(self, frame_buffer, delta_ms=0):
+        """Read the next encoded frame to put on the line. The frame is taken from the station which has
+        the turn, according to the same rules as the :meth:`hdlc.Sender.read` method.
+
+        :param frame_buffer: Writable buffer used to store the frame in.
+        :type frame_buffer: bytes
+        :param delta_ms: Number of milliseconds elapsed since the last call to this method.
+        :type delta_ms: int
+
+        :returns: The number of bytes stored in the provided frame buffer.
+        :rtype: int
+
+        :raises:
+            - :class:`hdlc.TimeoutError` - If a frame failed to be sent within the timeout period and retry
+              limit. The address of the station is the address of the frame.
+        """
+        self._time_ms += delta_ms
+
+        for sender in self.senders.values():
+            sender._advance(delta_ms)
+
+        turn = self._turn
+
+        # The station having the turn is visited again last, if it had used up its turn
+        for _ in range(len(self._addresses) + 1):
+            address = self._addresses[self._turn]
+            sender = self.senders[address]
+
+            if self._credit == 0:
+                self._begin_turn(address, sender)
+
+            frame_length = sender.read(frame_buffer)
+
+            if frame_length > 0:
+                self._polled[address] = self._time_ms
+                self._credit -= 1
+
+                if self._credit == 0:
+                    self._turn = (self._turn + 1) % len(self._addresses)
+
+                return frame_length
+
+            self._credit = 0
+            self._turn = (self._turn + 1) % len(self._addresses)
+
+        # Nothing to send, the next frame is taken in the same order as if the line had been busy
+        self._turn = turn
+        return 0
+
+    def _begin_turn(self, address, sender):
+        backlog = len(sender._pending) + len(sender._queue)
+
+        if (self.poll_interval_ms is not None and backlog == 0 and len(sender._timers) == 0
+                and self._time_ms - self._polled[address] >= self.poll_interval_ms):
+            sender.write_frame(SFrame(address, sender.receive_sequence_number, True, SUPERVISORY_RECEIVE_READY),
+                priority=1)
+            backlog = 1
+
+        self._credit = max(1, backlog) if self.weighted else 1
+
+def multidrop(addresses, buffer_length=128, write_timeout_ms=500, write_retries=1, mode=NORMAL_RESPONSE_MODE,
+        window_size=1, extended=False, acknowledge_frames=1, acknowledge_delay_ms=0, weighted=False,
+        poll_interval_ms=None):
+    """Create a receiver and sender pair for a master node talking to several slave nodes sharing the same
+    line, e.g. an RS-485 bus. Each slave has its own protocol state, the same as a pair created by
+    :func:`hdlc.protocol`, while incoming data is decoded once by a single receiver.
+
+    :param addresses: Addresses of the slave nodes.
+    :type addresses: list
+    :param buffer_length: Length of the internal receiver buffer and of the sender buffer of each station.
+    :type buffer_length: int
+    :param weighted: If stations with more frames waiting are given longer turns on the line.
+        See :class:`hdlc.MultidropSender`.
+    :type weighted: bool
+    :param poll_interval_ms: Time after which an idle station is polled. Default is no polling.
+    :type poll_interval_ms: int
+
+    The remaining parameters are the same as for :func:`hdlc.protocol` and apply to every station.
+
+    :returns: The receiver and sender pair.
+    :rtype: tuple
+    """
+    senders = {}
+    stations = {}
+
+    for address in addresses:
+        senders[address] = ProtocolSender(address, buffer_length, write_retries, write_timeout_ms, window_size,
+            extended)
+        stations[address] = ProtocolReceiver(senders[address], True, address, mode, 0, extended,
+            acknowledge_frames, acknowledge_delay_ms)
+
+    receiver = MultidropReceiver(stations, buffer_length, extended)
+    sender = MultidropSender(senders, weighted, poll_interval_ms)
+    return receiver, sender
+
+class Demux:
+    """Routes the frames of several logical links sharing a byte stream by address. The stream is written
+    to a single internal receiver and each frame is decoded once, instead of every link decoding the whole
+    stream.
+
+    Frames for an address registered with a handler are passed to the handler as soon as they are decoded.
+    Frames for an address registered without a handler are queued and read with
+    :meth:`hdlc.Demux.read_frame`. When the queue of an address is full, decoding stops and the data is kept
+    in the internal buffer until the frames are read, reducing :attr:`hdlc.Demux.available_length` so the
+    writer can hold back further data. Frames for unregistered addresses are dropped.
+
+    :param buffer_length: Number of bytes to allocate for the internal buffer.
+    :type buffer_length: int
+    :param extended: If the extended (modulo 128) sequence numbering is used.
+    :type extended: bool
+    :param queue_length: Maximum number of frames queued per address.
+    :type queue_length: int
+
+    :ivar receiver: The receiver decoding the stream.
+    :vartype receiver: :class:`hdlc.Receiver`
+    :ivar dropped: Number of frames dropped since there was no registration for the address.
+    :vartype dropped: int
+    """
+    def __init__(self, buffer_length=128, extended=False, queue_length=8):
+        self.receiver = Receiver(buffer_length, extended)
+        self.queue_length = queue_length
+        self.dropped = 0
+        self._handlers = {}
+        self._queues = {}
+
+    @property
+    def available_length(self):
+        """Available space in the internal data buffer.
+        """
+        return self.receiver.available_length
+
+    def register(self, address, handler=None):
+        """Register an address, replacing any previous registration of the same address.
+
+        :param address: Frame address.
+        :type address: int
+        :param handler: Called with the information data as a memoryview, the frame and the checksum
+            validity of every frame with the address. The memoryview is only valid during the call.
+            Default is to queue the frames.
+        :type handler: callable
+        """
+        self.unregister(address)
+
+        if handler is not None:
+            self._handlers[address] = handler
+        else:
+            self._queues[address] = []
+
+    def unregister(self, address):
+        """Remove the registration of an address. Queued frames are discarded.
+
+        :param address: Frame address.
+        :type address: int
+        """
+        self._handlers.pop(address, None)
+        self._queues.pop(address, None)
+
+    def write(self, buffer, offset=0, length=None):
+        """Write data to the internal buffer and route all decoded frames.
+
+        :param buffer: Buffer containing the data to write.
+        :type buffer: bytes
+        :param offset: Offset into the buffer.
+        :type offset: int
+        :param length: Number of bytes to write. Default is the rest of the buffer.
+        :type length: int
+
+        :raises:
+            - :class:`ValueError` - If there is no more space in the internal buffer.
+        """
+        self.receiver.write(buffer, offset, length)
+        self.route()
+
+    def route(self):
+        """Route the decoded frames in the internal buffer. Called by :meth:`hdlc.Demux.write` and
+        :meth:`hdlc.Demux.read_frame`, only needed if a handler has been registered for an address
+        which has frames waiting in the buffer.
+
+        :returns: The number of routed frames, not including dropped frames.
+        :rtype: int
+        """
+        receiver = self.receiver
+        count = 0
+
+        while True:
+            information_length, frame, valid = receiver._next_frame()
+
+            if frame is None:
+                break
+
+            handler = self._handlers.get(frame.address)
+            queue = self._queues.get(frame.address)
+
+            if queue is not None and len(queue) >= self.queue_length:
+                # The frame is kept in the buffer until there is room in the queue
+                break
+
+            view = receiver._payload(information_length)
+            receiver._pop_frame()
+
+            if handler is not None:
+                handler(view, frame, valid)
+                count += 1
+            elif queue is not None:
+                queue.append((bytes(view), frame, valid))
+                count += 1
+            else:
+                self.dropped += 1
+
+        return count
+
+    def queued(self, address):
+        """Number of frames queued for an address.
+
+        :param address: Frame address.
+        :type address: int
+
+        :returns: The number of queued frames.
+        :rtype: int
+        """
+        return len(self._queues[address])
+
+    def read_frame(self, address, information_buffer):
+        """Read the information part of the oldest frame queued for an address.
+
+        :param address: Frame address, registered without a handler.
+        :type address: int
+        :param information_buffer: Writable buffer used to store the information data of the frame.
+        :type information_buffer: bytes
+
+        :returns: The number of bytes stored in the provided information buffer, the frame and if the
+            checksum was valid. The frame is None and valid False if there is no frame.
+        :rtype: tuple
+
+        :raises:
+            - :class:`KeyError` - If the address is not registered for queueing.
+        """
+        queue = self._queues[address]
+
+        if len(queue) == 0:
+            return (0, None, False)
+
+        data, frame, valid = queue.pop(0)
+        copy(data, information_buffer, 0, 0, len(data))
+
+        if len(queue) == self.queue_length - 1:
+            # Frames may have been held back by the full queue
+            self.route()
+
+        return (len(data), frame, valid)
@@ -0,0 +1,214 @@
+import collections
+import queue
+import threading
+import time
+
+from .hdlc import NORMAL_RESPONSE_MODE, protocol
+
+_CLOSED = object()
+
+class _Waiter:
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.error = None
+        self.event = threading.Event()
+
+    def done(self, error=None):
+        self.error = error
+        self.event.set()
+
+class ThreadedLink:
+    """Runs a receiver and sender pair created by :func:`hdlc.protocol` on a dedicated I/O thread, so the
+    link can be used from any number of application threads. The receiver and sender are only accessed by
+    the I/O thread, data is handed over through a deque for outgoing and a queue for incoming messages.
+
+    The I/O thread repeatedly calls the transport read function, which should block for at most a short
+    time, e.g. a serial port with a read timeout of a few milliseconds. The read timeout bounds the delay
+    before a sent message is written to the transport.
+
+    :param read: Called with the maximum number of bytes to read, returning the bytes read from the
+        transport, possibly empty.
+    :type read: callable
+    :param write: Called with bytes to write to the transport.
+    :type write: callable
+    :param master: If the link should act as a master node and initiate the communication
+        with the remote node.
+    :type master: bool
+    :param address: The address of the remote slave node if master is True, otherwise the address of
+        the current slave node.
+    :type address: int
+
+    The remaining parameters are passed on to :func:`hdlc.protocol`.
+
+    :ivar receiver: The receiver decoding incoming data. Must not be used while the link is running.
+    :vartype receiver: :class:`hdlc.ProtocolReceiver`
+    :ivar sender: The sender encoding outgoing frames. Must not be used while the link is running.
+    :vartype sender: :class:`hdlc.ProtocolSender`
+    :ivar error: The error which stopped the I/O thread, if any.
+    :vartype error: Exception
+    """
+    def __init__(self, read, write, master, address, buffer_length=128, write_timeout_ms=500, write_retries=1,
+            mode=NORMAL_RESPONSE_MODE, window_size=1, extended=False, acknowledge_frames=1, acknowledge_delay_ms=0):
+        self.receiver, self.sender = protocol(master, address, buffer_length, write_timeout_ms, write_retries, mode,
+            window_size, extended, acknowledge_frames, acknowledge_delay_ms)
+        self.error = None
+        self._read = read
+        self._write = write
+        self._frame_buffer = bytearray(self.sender.frame_buffer_length)
+        self._outgoing = collections.deque()
+        self._incoming = queue.SimpleQueue()
+        self._waiters = []
+        self._closed = False
+        self._thread = None
+
+    def start(self):
+        """Start the I/O thread.
+
+        :returns: The link itself.
+        :rtype: :class:`hdlc.threaded.ThreadedLink`
+        """
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Stop the I/O thread and wait for it to finish. Pending :meth:`hdlc.threaded.ThreadedLink.send`
+        calls fail and :meth:`hdlc.threaded.ThreadedLink.recv` returns None once all received messages
+        have been read.
+        """
+        self._closed = True
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def send(self, buffer):
+        """Send data in an information frame and block until the remote node has acknowledged it. Safe to
+        call from several threads at the same time.
+
+        :param buffer: Data to send.
+        :type buffer: bytes
+
+        :raises:
+            - :class:`ValueError` - If the data is longer than the sender buffer.
+            - :class:`hdlc.TimeoutError` - If the frame was not acknowledged within the timeout and retry limit.
+            - :class:`ConnectionError` - If the link was closed or reset by a new handshake before the frame
+              was acknowledged.
+        """
+        if self._closed:
+            raise ConnectionError('Link closed')
+
+        waiter = _Waiter(bytes(buffer))
+        self._outgoing.append(waiter)
+
+        if self._closed:
+            # Closed while appending, the message may have been missed when the I/O thread stopped
+            if self._thread is not None:
+                self._thread.join()
+
+            if not waiter.event.is_set():
+                waiter.done(ConnectionError('Link closed'))
+
+        waiter.event.wait()
+
+        if waiter.error is not None:
+            raise waiter.error
+
+    def recv(self, timeout=None):
+        """Receive the data of the next information frame. Safe to call from several threads at the
+        same time.
+
+        :param timeout: Maximum time in seconds to wait for a message. Default is to wait until a message
+            is received or the link is closed.
+        :type timeout: float
+
+        :returns: The received data. None if no message was received within the timeout or the link
+            is closed.
+        :rtype: bytes
+        """
+        try:
+            message = self._incoming.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+        if message is _CLOSED:
+            # Keep the end marker for other receiving threads
+            self._incoming.put(_CLOSED)
+            return None
+
+        return message
+
+    def _run(self):
+        time_s = time.monotonic()
+
+        try:
+            while not self._closed:
+                self._take_outgoing()
+                data = self._read(self.receiver.available_length)
+
+                if data:
+                    self._receive(data)
+
+                elapsed_ms = int((time.monotonic() - time_s) * 1000)
+                time_s += elapsed_ms / 1000
+                self._flush(elapsed_ms)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._closed = True
+            self._fail(self.error if self.error is not None else ConnectionError('Link closed'))
+            self._incoming.put(_CLOSED)
+
+    def _take_outgoing(self):
+        while len(self._outgoing) > 0:
+            waiter = self._outgoing[0]
+            length = len(waiter.buffer)
+
+            if length <= len(self.sender.buffer) and length > self.sender.available_length:
+                # Kept until acknowledged frames have made room in the buffer
+                break
+
+            self._outgoing.popleft()
+
+            try:
+                frame = self.sender.write(waiter.buffer)
+            except ValueError as e:
+                waiter.done(e)
+                continue
+
+            self._waiters.append((frame, self.sender.generation, waiter))
+
+    def _receive(self, data):
+        for message, frame, valid in self.receiver.iter_frames((data,)):
+            self._incoming.put(message)
+
+        self._waiters, acknowledged, dropped = self.sender.settle(self._waiters)
+
+        for waiter in acknowledged:
+            waiter.done()
+
+        for waiter in dropped:
+            waiter.done(ConnectionError('Link reset before the frame was acknowledged'))
+
+    def _flush(self, delta_ms):
+        # A timeout of the handshake is raised, the link is unusable
+        for error in self.sender.drain(self._frame_buffer, self._write, delta_ms):
+            for waiter in self._waiters:
+                if waiter[0] is error.frame:
+                    self._waiters.remove(waiter)
+                    waiter[2].done(error)
+                    break
+
+    def _fail(self, error):
+        waiters, self._waiters = self._waiters, []
+
+        for frame, generation, waiter in waiters:
+            waiter.done(error)
+
+        while len(self._outgoing) > 0:
+            self._outgoing.popleft().done(error)
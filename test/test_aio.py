@@ -0,0 +1,116 @@
+from hdlc import TimeoutError, FRAME_UNNUMBERED
+from hdlc.aio import Link
+import asyncio
+import pytest
+
+class Transport(asyncio.Transport):
+    def __init__(self, link):
+        super().__init__()
+        self.link = link
+        self.peer = None
+        self.dropping = False
+        self.closed = False
+
+    def write(self, data):
+        if not self.dropping and not self.closed:
+            asyncio.get_running_loop().call_soon(self.peer.link.data_received, bytes(data))
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            asyncio.get_running_loop().call_soon(self.link.connection_lost, None)
+            self.peer.close()
+
+def connect(master, slave, dropping=False):
+    master_transport, slave_transport = Transport(master), Transport(slave)
+    master_transport.dropping = dropping
+    master_transport.peer, slave_transport.peer = slave_transport, master_transport
+    slave.connection_made(slave_transport)
+    master.connection_made(master_transport)
+    return master_transport, slave_transport
+
+def test_transfer():
+    async def run():
+        master = Link(True, 0xAA, window_size=4, write_timeout_ms=100)
+        slave = Link(False, 0xAA, window_size=4, acknowledge_frames=4, acknowledge_delay_ms=10)
+        connect(master, slave)
+
+        messages = [b'test ' + bytes(str(i), encoding='utf8') for i in range(20)]
+        await asyncio.gather(*[master.send(message) for message in messages])
+
+        assert len(master.sender.frames) == 0
+
+        await slave.send(b'reply')
+        master.close()
+
+        assert [message async for message in slave] == messages
+        assert [message async for message in master] == [b'reply']
+
+    asyncio.run(run())
+
+def test_send_timeout():
+    async def run():
+        master = Link(True, 0xAA, write_timeout_ms=20, write_retries=1)
+        slave = Link(False, 0xAA)
+        master_transport, slave_transport = connect(master, slave)
+
+        await master.send(b'test 1')
+
+        master_transport.dropping = True
+
+        with pytest.raises(TimeoutError, match='Did not receive ack within timeout') as error:
+            await master.send(b'test 2')
+
+        assert error.value.frame.send_sequence_number == 1
+        assert len(master.sender.frames) == 0
+
+        master.close()
+
+        with pytest.raises(ConnectionError):
+            await master.send(b'test 3')
+
+    asyncio.run(run())
+
+def test_handshake_timeout():
+    async def run():
+        master = Link(True, 0xAA, write_timeout_ms=20, write_retries=1)
+        slave = Link(False, 0xAA)
+        connect(master, slave, dropping=True)
+
+        with pytest.raises(TimeoutError) as error:
+            await master.send(b'test')
+
+        assert error.value.frame.frame_type == FRAME_UNNUMBERED
+        assert not master.receiver.initialized
+
+        assert [message async for message in master] == []
+
+    asyncio.run(run())
+
+def test_send_reset():
+    async def run():
+        master = Link(True, 0xAA, write_timeout_ms=1000)
+        slave = Link(False, 0xAA, write_timeout_ms=1000)
+        master_transport, slave_transport = connect(master, slave)
+
+        await master.send(b'test 1')
+
+        slave_transport.dropping = True
+        send = asyncio.ensure_future(slave.send(b'test 2'))
+        await asyncio.sleep(0)
+
+        assert not send.done()
+
+        # A new handshake from the master discards the unacknowledged frame
+        slave.data_received(b'~\xaaS\xd6=~')
+
+        with pytest.raises(ConnectionError, match='Link reset before the frame was acknowledged'):
+            await send
+
+        slave_transport.dropping = False
+        await slave.send(b'test 3')
+        master.close()
+
+        assert [message async for message in master] == [b'test 3']
+
+    asyncio.run(run())
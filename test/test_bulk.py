@@ -0,0 +1,69 @@
+from hdlc import Receiver, Sender, IFrame
+from hdlc.bulk import split, decode_chunk, decode_file
+import random
+import pytest
+
+def capture():
+    generator = random.Random(5)
+    sender = Sender(buffer_length=256)
+    frame_buffer = bytearray(1024)
+    stream = bytearray(b'garbage')
+
+    for i in range(300):
+        data = bytes(generator.choice(b'~}ab') for _ in range(generator.randint(0, 100)))
+        sender.write_frame(IFrame(0xAA, 0, False, i % 8), data)
+        read = sender.read(frame_buffer)
+
+        if i % 100 == 50:
+            # Corrupted frame
+            frame_buffer[read // 2] ^= 0x01
+
+        stream += frame_buffer[0:read]
+
+    return bytes(stream + b'~\xaa\x10tes')
+
+def test_split():
+    stream = capture()
+    chunks = list(split(stream, 500))
+
+    assert len(chunks) > 10
+    assert chunks[0][0] == 0
+    assert chunks[-1][1] == len(stream)
+    assert all(stream[end] == 0x7E for start, end in chunks[:-1])
+    assert all(chunks[i][1] == chunks[i + 1][0] for i in range(len(chunks) - 1))
+
+def test_split_invalid_chunk_length(tmp_path):
+    path = tmp_path / 'capture.bin'
+    path.write_bytes(capture())
+
+    for chunk_length in (0, -1):
+        with pytest.raises(ValueError, match='Invalid chunk length'):
+            list(split(b'~\xaa~', chunk_length))
+
+        with pytest.raises(ValueError, match='Invalid chunk length'):
+            list(decode_file(str(path), chunk_length=chunk_length))
+
+def test_decode_file(tmp_path):
+    stream = capture()
+    path = tmp_path / 'capture.bin'
+    path.write_bytes(stream)
+
+    expected = [(data, repr(frame), valid) for data, frame, valid in Receiver(256).iter_frames([stream])]
+    frames = list(decode_file(str(path), processes=2, chunk_length=500))
+
+    assert len(frames) == 300
+    assert sum(1 for offset, data, frame, valid in frames if not valid) == 3
+    assert [(data, repr(frame)) for offset, data, frame, valid in frames if valid] == [
+        (data, frame) for data, frame, valid in expected if valid]
+    assert [(offset, data, repr(frame), valid) for offset, data, frame, valid in frames] == [
+        (offset, data, repr(frame), valid) for offset, data, frame, valid in decode_chunk(stream)]
+
+    for offset, data, frame, valid in frames:
+        assert stream[offset] == 0x7E
+        assert stream[offset + 1] == 0xAA
+
+def test_decode_empty_file(tmp_path):
+    path = tmp_path / 'capture.bin'
+    path.write_bytes(b'')
+
+    assert list(decode_file(str(path))) == []
@@ -0,0 +1,130 @@
+from hdlc import protocol
+from hdlc.capture import Recorder, Capture, decode_capture, reindex, DIRECTION_RECEIVED, DIRECTION_SENT
+import pytest
+
+def record_transfer(path):
+    master_receiver, master_sender = protocol(True, 0xAA)
+    slave_receiver, slave_sender = protocol(False, 0xAA)
+    buffer = bytearray(128)
+    timestamp = 1000.0
+
+    with Recorder(path) as recorder:
+        for i in range(10):
+            if i > 0:
+                master_sender.write(b'test ' + bytes(str(i), encoding='utf8'))
+
+            read = master_sender.read(buffer)
+            recorder.record(DIRECTION_SENT, buffer, 0, read, timestamp)
+            slave_receiver.write(buffer, 0, read)
+            slave_receiver.read(buffer)
+
+            read = slave_sender.read(buffer)
+
+            # Responses are received in two parts
+            recorder.record(DIRECTION_RECEIVED, buffer, 0, 3, timestamp + 0.25)
+            recorder.record(DIRECTION_RECEIVED, buffer[3:read], timestamp=timestamp + 0.5)
+            master_receiver.write(buffer, 0, read)
+            master_receiver.read(buffer)
+            timestamp += 1
+
+def test_record_read(tmp_path):
+    path = str(tmp_path / 'capture.bin')
+    record_transfer(path)
+
+    with Capture(path) as capture:
+        assert len(capture) == 30
+
+        timestamp, direction, data = capture[1]
+
+        assert timestamp == 1000.25
+        assert direction == DIRECTION_RECEIVED
+        assert data == b'~\xaas'
+
+        assert capture[-1][0] == 1009.5
+        assert capture.find(1003) == 9
+        assert capture.find(1003.1) == 10
+        assert capture.find(2000) == 30
+
+        with pytest.raises(IndexError):
+            capture[30]
+
+        sent = list(capture.iter_frames(DIRECTION_SENT))
+
+        assert len(sent) == 10
+        assert all(valid for timestamp, data, frame, valid in sent)
+        assert [data for timestamp, data, frame, valid in sent[1:]] == [
+            b'test ' + bytes(str(i), encoding='utf8') for i in range(1, 10)]
+
+        received = list(capture.iter_frames(DIRECTION_RECEIVED, start=capture.find(1005)))
+
+        assert len(received) == 5
+        assert received[0][0] == 1005.5
+        assert all(valid for timestamp, data, frame, valid in received)
+
+def test_record_kept_after_close(tmp_path):
+    path = str(tmp_path / 'capture.bin')
+    record_transfer(path)
+
+    with Capture(path) as capture:
+        timestamp, direction, data = capture[0]
+
+    assert timestamp == 1000.0
+    assert direction == DIRECTION_SENT
+    assert data[0:1] == b'~'
+
+def test_read_while_recording(tmp_path):
+    path = str(tmp_path / 'capture.bin')
+
+    with Recorder(path) as recorder:
+        for i in range(600):
+            recorder.record(DIRECTION_SENT, b'~\xaa\x00' + bytes([i % 256]) + b'~', timestamp=1000 + i)
+
+            if i in (0, 599):
+                # Only records which have reached the capture file are indexed
+                with Capture(path) as capture:
+                    for number in range(len(capture)):
+                        assert capture[number] == (1000 + number, DIRECTION_SENT,
+                            b'~\xaa\x00' + bytes([number % 256]) + b'~')
+
+    with Capture(path) as capture:
+        assert len(capture) == 600
+
+    with open(path, 'r+b') as file:
+        # Truncated last record
+        file.truncate(file.seek(0, 2) - 1)
+
+    with Capture(path) as capture:
+        assert len(capture) == 599
+        assert capture[-1][0] == 1598
+
+def test_append_reindex(tmp_path):
+    path = str(tmp_path / 'capture.bin')
+    record_transfer(path)
+
+    with Recorder(path) as recorder:
+        recorder.record(DIRECTION_SENT, b'~\xaa', timestamp=2000)
+
+    with open(path, 'ab') as file:
+        # Truncated record
+        file.write(b'\x00\x00')
+
+    (tmp_path / 'capture.bin.idx').unlink()
+
+    assert reindex(path) == 31
+
+    with Capture(path) as capture:
+        assert len(capture) == 31
+        assert capture[30][0] == 2000
+        assert len(list(capture.iter_frames(DIRECTION_SENT))) == 10
+
+def test_decode_capture(tmp_path):
+    path = tmp_path / 'raw.bin'
+    path.write_bytes(b'garbage~\xaaptest\xe6\xb0~~\xaa!Cm~\xaa\x10te')
+    frames = list(decode_capture(str(path)))
+
+    assert [(offset, data, valid) for offset, data, frame, valid in frames] == [(7, b'test', True), (17, b'', True)]
+    assert frames[0][2].send_sequence_number == 0
+    assert frames[1][2].receive_sequence_number == 1
+
+    with pytest.raises(ValueError, match='Not a capture file'):
+        reindex(str(path))
@@ -1,4 +1,10 @@
-from hdlc import TimeoutError, protocol, NORMAL_RESPONSE_MODE
+from hdlc import TimeoutError, protocol, multidrop, NORMAL_RESPONSE_MODE
+from hdlc import IFrame, SFrame, UFrame, SUPERVISORY_RECEIVE_READY, FRAME_SUPERVISORY
+from hdlc import SUPERVISORY_REJECT, SUPERVISORY_SELECTIVE_REJECT
+from hdlc.hdlc import _copy_loop, _copy_slice, encode_frame, decode_frame
+from hdlc.hdlc import _CRC16_TABLE, _fcs16_native, _fcs16_table
+from hdlc import hdlc
+import random
 import pytest
 
 def test_handshake_block_send():
@@ -257,11 +263,6 @@ def test_receive_reject():
 
     read = sender.read(buffer)
 
-    assert read == 0
-    assert len(sender.frames) == 1
-
-    read = sender.read(buffer, delta_ms=150)
-
     assert read == 10
     assert buffer[0:10] == b'~\xaaptest\xe6\xb0~'
     assert len(sender.frames) == 1
@@ -270,6 +271,11 @@ def test_receive_reject():
 
     assert read == 0
 
+    with pytest.raises(TimeoutError, match='Did not receive ack within timeout'):
+        sender.read(buffer, delta_ms=150)
+
+    assert len(sender.frames) == 0
+
 def test_receive_valid_frame_with_overflowing_sequence_number():
     receiver, sender = protocol(True, 0xAA, mode=NORMAL_RESPONSE_MODE)
     buffer = bytearray(128)
@@ -463,3 +469,747 @@ def test_slave_receive_valid_frame_with_bad_address():
     read = sender.read(buffer)
 
     assert read == 0
+
+def test_window_transfer():
+    master_receiver, master_sender = protocol(True, 0xAA, window_size=3)
+    slave_receiver, slave_sender = protocol(False, 0xAA, window_size=3)
+    buffer = bytearray(128)
+
+    read = master_sender.read(buffer)
+    slave_receiver.write(buffer, 0, read)
+
+    assert slave_receiver.read(buffer) == 0
+
+    read = slave_sender.read(buffer)
+    master_receiver.write(buffer, 0, read)
+
+    assert master_receiver.read(buffer) == 0
+    assert master_receiver.initialized
+
+    for i in range(4):
+        master_sender.write(b'test ' + bytes(str(i + 1), encoding='utf8'))
+
+    for i in range(3):
+        read = master_sender.read(buffer)
+
+        assert read == 12
+
+        slave_receiver.write(buffer, 0, read)
+
+    assert master_sender.read(buffer) == 0
+    assert len(master_sender.frames) == 4
+
+    for i in range(3):
+        read = slave_receiver.read(buffer)
+
+        assert read == 6
+        assert buffer[0:6] == b'test ' + bytes(str(i + 1), encoding='utf8')
+
+    while (read := slave_sender.read(buffer)) > 0:
+        master_receiver.write(buffer, 0, read)
+
+    assert master_receiver.read(buffer) == 0
+    assert len(master_sender.frames) == 1
+
+    read = master_sender.read(buffer)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x16test 4Y\xaf~'
+
+def test_window_lost_acknowledge():
+    master_receiver, master_sender = protocol(True, 0xAA, window_size=2)
+    slave_receiver, slave_sender = protocol(False, 0xAA, window_size=2)
+    buffer = bytearray(128)
+
+    read = master_sender.read(buffer)
+    slave_receiver.write(buffer, 0, read)
+    slave_receiver.read(buffer)
+
+    read = slave_sender.read(buffer)
+    master_receiver.write(buffer, 0, read)
+    master_receiver.read(buffer)
+
+    master_sender.write(b'test 1')
+    master_sender.write(b'test 2')
+
+    for i in range(2):
+        read = master_sender.read(buffer)
+        slave_receiver.write(buffer, 0, read)
+
+        assert slave_receiver.read(buffer) == 6
+
+    # First acknowledge is lost
+    assert slave_sender.read(buffer) == 6
+
+    read = slave_sender.read(buffer)
+    master_receiver.write(buffer, 0, read)
+
+    assert master_receiver.read(buffer) == 0
+    assert len(master_sender.frames) == 0
+    assert master_sender.length == 0
+
+def test_piggyback_acknowledge():
+    master_receiver, master_sender = protocol(True, 0xAA)
+    slave_receiver, slave_sender = protocol(False, 0xAA)
+    buffer = bytearray(128)
+
+    read = master_sender.read(buffer)
+    slave_receiver.write(buffer, 0, read)
+    slave_receiver.read(buffer)
+
+    read = slave_sender.read(buffer)
+    master_receiver.write(buffer, 0, read)
+    master_receiver.read(buffer)
+
+    master_sender.write(b'test 1')
+    slave_sender.write(b'test 2')
+
+    read = master_sender.read(buffer)
+    slave_receiver.write(buffer, 0, read)
+
+    assert slave_receiver.read(buffer) == 6
+    assert len(slave_sender.frames) == 2
+
+    # Information frame carries the acknowledge instead of a receive ready frame
+    read = slave_sender.read(buffer)
+
+    assert read == 12
+    assert len(slave_sender.frames) == 1
+
+    master_receiver.write(buffer, 0, read)
+
+    assert master_receiver.read(buffer) == 6
+    assert buffer[0:6] == b'test 2'
+    assert len(master_sender.frames) == 1
+    assert slave_sender.read(buffer) == 0
+
+    read = master_sender.read(buffer)
+
+    assert read == 6
+    assert buffer[0:6] == b'~\xaa!Cm~'
+
+    slave_receiver.write(buffer, 0, read)
+
+    assert slave_receiver.read(buffer) == 0
+    assert len(slave_sender.frames) == 0
+
+def test_receive_go_back():
+    receiver, sender = protocol(True, 0xAA, write_timeout_ms=100, write_retries=1, window_size=3)
+    buffer = bytearray(128)
+
+    sender.read(buffer)
+    receiver.write(b'~\xaas\xd4\x1c~')
+    receiver.read(buffer)
+
+    assert receiver.initialized
+
+    sender.write(b'test 1')
+    sender.write(b'test 2')
+    sender.write(b'test 3')
+
+    for i in range(3):
+        assert sender.read(buffer) == 12
+
+    receiver.write(b'~\xaa5\xe6;~')
+    read = receiver.read(buffer)
+
+    assert read == 0
+    assert len(sender.frames) == 2
+
+    read = sender.read(buffer)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x12test 2\x19\xa5~'
+
+    read = sender.read(buffer)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x14test 3]\xec~'
+
+    read = sender.read(buffer)
+
+    assert read == 0
+
+def test_window_selective_reject_recovery():
+    master_receiver, master_sender = protocol(True, 0xAA, window_size=4, write_timeout_ms=100)
+    slave_receiver, slave_sender = protocol(False, 0xAA, window_size=4)
+    buffer = bytearray(128)
+
+    read = master_sender.read(buffer)
+    slave_receiver.write(buffer, 0, read)
+    slave_receiver.read(buffer)
+    read = slave_sender.read(buffer)
+    master_receiver.write(buffer, 0, read)
+    master_receiver.read(buffer)
+
+    for i in range(4):
+        master_sender.write(b'test ' + bytes(str(i), encoding='utf8'))
+
+    for i in range(4):
+        read = master_sender.read(buffer)
+
+        if i == 1:
+            # Corrupted checksum
+            buffer[read - 2] ^= 0x01
+
+        slave_receiver.write(buffer, 0, read)
+
+    assert slave_receiver.read(buffer) == 6
+    assert slave_receiver.read(buffer) == 0
+
+    # Selective reject for the invalid frame, then a reject for the dropped frames after it
+    responses = []
+
+    while (read := slave_sender.read(buffer)) > 0:
+        responses.append(bytes(buffer[0:read]))
+
+    assert [decode_frame(response, len(response), bytearray(128))[2].supervisory_type for response in responses] == [
+        SUPERVISORY_RECEIVE_READY, SUPERVISORY_SELECTIVE_REJECT, SUPERVISORY_REJECT, SUPERVISORY_RECEIVE_READY]
+
+    master_receiver.write(responses[0] + responses[1])
+    master_receiver.read(buffer)
+    resent = [master_sender.read(buffer)]
+    slave_receiver.write(buffer, 0, resent[0])
+    master_receiver.write(responses[2] + responses[3])
+    master_receiver.read(buffer)
+
+    # The remaining frames are resent right away, the frame resent on the selective reject only once
+    while (read := master_sender.read(buffer)) > 0:
+        resent.append(read)
+        slave_receiver.write(buffer, 0, read)
+
+    assert len(resent) == 3
+
+    for i in range(1, 4):
+        assert slave_receiver.read(buffer) == 6
+        assert buffer[0:6] == b'test ' + bytes(str(i), encoding='utf8')
+
+    while (read := slave_sender.read(buffer)) > 0:
+        master_receiver.write(buffer, 0, read)
+
+    assert master_receiver.read(buffer) == 0
+    assert len(master_sender.frames) == 0
+
+def test_receive_out_of_sequence_frame():
+    receiver, sender = protocol(False, 0xAA)
+    buffer = bytearray(128)
+
+    receiver.write(b'~\xaaS\xd6=~')
+    receiver.read(buffer)
+    sender.read(buffer)
+
+    assert receiver.initialized
+
+    # Second frame is received before the first
+    receiver.write(b'~\xaartest 2\x9c\x01~')
+    read = receiver.read(buffer)
+
+    assert read == 0
+    assert len(sender.frames) == 1
+
+    read = sender.read(buffer)
+
+    assert read == 6
+    assert buffer[0:6] == b'~\xaa\x15\xe4\x1a~'
+
+    # Only one reject is sent for the gap
+    receiver.write(b'~\xaartest 2\x9c\x01~')
+    read = receiver.read(buffer)
+
+    assert read == 0
+
+    read = sender.read(buffer)
+
+    assert read == 6
+    assert buffer[0:6] == b'~\xaa\x01AL~'
+
+    receiver.write(b'~\xaaptest 1\xbc\x04~~\xaartest 2\x9c\x01~')
+
+    assert receiver.read(buffer) == 6
+    assert buffer[0:6] == b'test 1'
+    assert receiver.read(buffer) == 6
+    assert buffer[0:6] == b'test 2'
+
+def test_extended_transfer():
+    master_receiver, master_sender = protocol(True, 0xAA, buffer_length=1024, window_size=20, extended=True)
+    slave_receiver, slave_sender = protocol(False, 0xAA, buffer_length=1024, window_size=20, extended=True)
+    buffer = bytearray(1024)
+
+    read = master_sender.read(buffer)
+
+    assert buffer[0:read] == b'~\xaa\xdf\xb2s~'
+
+    slave_receiver.write(buffer, 0, read)
+    slave_receiver.read(buffer)
+
+    read = slave_sender.read(buffer)
+    master_receiver.write(buffer, 0, read)
+    master_receiver.read(buffer)
+
+    assert master_receiver.initialized
+
+    received = []
+
+    for i in range(130):
+        master_sender.write(bytes(str(i), encoding='utf8'))
+
+        if i % 20 == 19 or i == 129:
+            while (read := master_sender.read(buffer)) > 0:
+                slave_receiver.write(buffer, 0, read)
+
+                while (read := slave_receiver.read(buffer)) > 0:
+                    received.append(bytes(buffer[0:read]))
+
+            while (read := slave_sender.read(buffer)) > 0:
+                master_receiver.write(buffer, 0, read)
+
+            assert master_receiver.read(buffer) == 0
+            assert len(master_sender.frames) == 0
+
+    assert received == [bytes(str(i), encoding='utf8') for i in range(130)]
+    assert master_sender.sequence_number == 2
+    assert slave_receiver.sequence_number == 2
+
+def test_window_transfer_order():
+    master_receiver, master_sender = protocol(True, 0xAA, buffer_length=1024, window_size=7)
+    slave_receiver, slave_sender = protocol(False, 0xAA, buffer_length=1024, window_size=7)
+    buffer = bytearray(1024)
+    information_buffer = bytearray(1024)
+
+    read = master_sender.read(buffer)
+    slave_receiver.write(buffer, 0, read)
+    slave_receiver.read(buffer)
+
+    read = slave_sender.read(buffer)
+    master_receiver.write(buffer, 0, read)
+    master_receiver.read(buffer)
+
+    assert master_receiver.initialized
+
+    received = []
+    sent = []
+    supervisory_types = set()
+
+    for i in range(3000):
+        if i % 7 == 3:
+            # Frames written with write_frame are sent in write order as well
+            master_sender.write_frame(UFrame(0xAA, 0x00, False), bytes(str(i), encoding='utf8'))
+        else:
+            master_sender.write(bytes(str(i), encoding='utf8'))
+
+        if i % 50 == 49:
+            while (read := master_sender.read(buffer)) > 0:
+                _, information_length, frame, _ = decode_frame(buffer, read, information_buffer)
+                sent.append(bytes(information_buffer[0:information_length]))
+                slave_receiver.write(buffer, 0, read)
+
+                while (read := slave_receiver.read(buffer)) > 0:
+                    received.append(bytes(buffer[0:read]))
+
+                while (read := slave_sender.read(buffer)) > 0:
+                    _, _, frame, _ = decode_frame(buffer, read, information_buffer)
+
+                    if frame.frame_type == FRAME_SUPERVISORY:
+                        supervisory_types.add(frame.supervisory_type)
+
+                    master_receiver.write(buffer, 0, read)
+
+                assert master_receiver.read(buffer) == 0
+
+            assert len(master_sender.frames) == 0
+
+    assert sent == [bytes(str(i), encoding='utf8') for i in range(3000)]
+    assert received == [bytes(str(i), encoding='utf8') for i in range(3000) if i % 7 != 3]
+    assert supervisory_types == {SUPERVISORY_RECEIVE_READY}
+
+def test_window_transfer_read_many():
+    master_receiver, master_sender = protocol(True, 0xAA, window_size=3)
+    slave_receiver, slave_sender = protocol(False, 0xAA, window_size=3)
+    buffer = bytearray(128)
+
+    read = master_sender.read_many(buffer)
+    slave_receiver.write(buffer, 0, read)
+    slave_receiver.read(buffer)
+
+    read = slave_sender.read_many(buffer)
+    master_receiver.write(buffer, 0, read)
+    master_receiver.read(buffer)
+
+    assert master_receiver.initialized
+
+    for i in range(3):
+        master_sender.write(b'test ' + bytes(str(i + 1), encoding='utf8'))
+
+    read = master_sender.read_many(buffer)
+
+    assert read == 34
+
+    slave_receiver.write(buffer, 0, read)
+
+    for i in range(3):
+        read = slave_receiver.read(buffer)
+
+        assert read == 6
+        assert buffer[0:6] == b'test ' + bytes(str(i + 1), encoding='utf8')
+
+    # Receive ready frames for every received frame are sent together
+    read = slave_sender.read_many(buffer)
+
+    assert read == 16
+
+    master_receiver.write(buffer, 0, read)
+
+    assert master_receiver.read(buffer) == 0
+    assert len(master_sender.frames) == 0
+
+def test_window_transfer_read_frames():
+    master_receiver, master_sender = protocol(True, 0xAA, window_size=7)
+    slave_receiver, slave_sender = protocol(False, 0xAA, window_size=7)
+    buffer = bytearray(128)
+    information_buffer = bytearray(20)
+    offsets = [0] * 8
+    lengths = [0] * 8
+
+    read = master_sender.read(buffer)
+    slave_receiver.write(buffer, 0, read)
+
+    assert slave_receiver.read_frames(information_buffer, offsets, lengths) == 0
+
+    read = slave_sender.read(buffer)
+    master_receiver.write(buffer, 0, read)
+
+    assert master_receiver.read_frames(information_buffer, offsets, lengths) == 0
+    assert master_receiver.initialized
+
+    for i in range(7):
+        master_sender.write(b'test ' + bytes(str(i + 1), encoding='utf8'))
+
+    read = master_sender.read_many(buffer)
+    slave_receiver.write(buffer, 0, read)
+
+    # Frames which do not fit in the information buffer are kept
+    assert slave_receiver.read_frames(information_buffer, offsets, lengths) == 3
+    assert offsets[0:3] == [0, 6, 12]
+    assert lengths[0:3] == [6, 6, 6]
+    assert information_buffer[0:18] == b'test 1test 2test 3'
+
+    # Single acknowledge for all received frames
+    read = slave_sender.read_many(buffer)
+
+    assert buffer[0:read] == b'~\xaaaG/~'
+
+    assert slave_receiver.read_frames(information_buffer, offsets[0:2], lengths) == 2
+    assert information_buffer[0:12] == b'test 4test 5'
+    assert slave_receiver.read_frames(information_buffer, offsets, lengths) == 2
+    assert information_buffer[0:12] == b'test 6test 7'
+    assert slave_receiver.read_frames(information_buffer, offsets, lengths) == 0
+
+    read = slave_sender.read_many(buffer)
+    master_receiver.write(buffer, 0, read)
+
+    assert master_receiver.read_frames(information_buffer, offsets, lengths) == 0
+    assert len(master_sender.frames) == 0
+    assert slave_receiver.sequence_number == 7
+
+def test_window_transfer_delayed_acknowledge():
+    master_receiver, master_sender = protocol(True, 0xAA, window_size=7)
+    slave_receiver, slave_sender = protocol(False, 0xAA, window_size=7, acknowledge_frames=7,
+        acknowledge_delay_ms=50)
+    buffer = bytearray(128)
+
+    read = master_sender.read(buffer)
+    slave_receiver.write(buffer, 0, read)
+    slave_receiver.read(buffer)
+
+    read = slave_sender.read(buffer)
+    master_receiver.write(buffer, 0, read)
+    master_receiver.read(buffer)
+
+    assert master_receiver.initialized
+
+    for i in range(10):
+        master_sender.write(b'test ' + bytes(str(i), encoding='utf8'))
+
+    # A burst of seven frames is acknowledged by a single frame
+    for i in range(7):
+        read = master_sender.read(buffer)
+        slave_receiver.write(buffer, 0, read)
+
+        assert slave_receiver.read(buffer) == 6
+        assert buffer[0:6] == b'test ' + bytes(str(i), encoding='utf8')
+
+    read = slave_sender.read(buffer)
+
+    assert read == 6
+    assert buffer[0:6] == b'~\xaa\xe1O\xab~'
+    assert slave_sender.read(buffer) == 0
+
+    master_receiver.write(buffer, 0, read)
+
+    assert master_receiver.read(buffer) == 0
+    assert len(master_sender.frames) == 3
+
+    # Remaining frames are acknowledged after the delay
+    while (read := master_sender.read(buffer)) > 0:
+        slave_receiver.write(buffer, 0, read)
+
+        assert slave_receiver.read(buffer) == 6
+
+    assert slave_sender.read(buffer, delta_ms=49) == 0
+
+    read = slave_sender.read(buffer, delta_ms=1)
+    master_receiver.write(buffer, 0, read)
+
+    assert master_receiver.read(buffer) == 0
+    assert len(master_sender.frames) == 0
+    assert slave_receiver.sequence_number == 2
+
+def test_read_view():
+    master_receiver, master_sender = protocol(True, 0xAA)
+    slave_receiver, slave_sender = protocol(False, 0xAA)
+    buffer = bytearray(128)
+
+    read = master_sender.read(buffer)
+    slave_receiver.write(buffer, 0, read)
+
+    assert slave_receiver.read_view() is None
+
+    read = slave_sender.read(buffer)
+    master_receiver.write(buffer, 0, read)
+
+    assert master_receiver.read_view() is None
+    assert master_receiver.initialized
+
+    master_sender.write(b'test 1')
+    read = master_sender.read(buffer)
+    slave_receiver.write(buffer, 0, read)
+    view = slave_receiver.read_view()
+
+    assert view == b'test 1'
+    assert slave_receiver.read_view() is None
+
+    read = slave_sender.read(buffer)
+    master_receiver.write(buffer, 0, read)
+
+    assert master_receiver.read_view() is None
+    assert len(master_sender.frames) == 0
+
+def exchange_multidrop(master_receiver, master_sender, slaves, delta_ms=0):
+    # Passes every frame sent by the master to all slaves and the responses back. Returns the addresses
+    # of the sent frames, the data received by the master and the data received by each slave.
+    buffer = bytearray(128)
+    addresses = []
+    received = []
+    slave_received = [[] for _ in slaves]
+
+    while (read := master_sender.read(buffer, delta_ms)) > 0:
+        delta_ms = 0
+        addresses.append(decode_frame(buffer, read, bytearray(128))[2].address)
+
+        for slave_receiver, slave_sender in slaves:
+            slave_receiver.write(buffer, 0, read)
+
+    for i, (slave_receiver, slave_sender) in enumerate(slaves):
+        while (view := slave_receiver.read_view()) is not None:
+            slave_received[i].append(bytes(view))
+
+        while (read := slave_sender.read(buffer)) > 0:
+            master_receiver.write(buffer, 0, read)
+
+    while (view := master_receiver.read_view())[0] is not None:
+        received.append((view[1], bytes(view[0])))
+
+    return addresses, received, slave_received
+
+def test_multidrop_transfer():
+    master_receiver, master_sender = multidrop([0x01, 0x02, 0x03], window_size=3)
+    slaves = [protocol(False, address, window_size=3) for address in (0x01, 0x02, 0x03)]
+
+    # Handshake with every station
+    assert exchange_multidrop(master_receiver, master_sender, slaves) == ([0x01, 0x02, 0x03], [], [[], [], []])
+    assert all(station.initialized for station in master_receiver.stations.values())
+
+    for i in range(3):
+        master_sender.write(0x01, b'one ' + bytes(str(i), encoding='utf8'))
+
+    master_sender.write(0x03, b'three')
+
+    # Stations take turns
+    addresses, received, slave_received = exchange_multidrop(master_receiver, master_sender, slaves)
+
+    assert addresses == [0x01, 0x03, 0x01, 0x01]
+    assert slave_received == [[b'one 0', b'one 1', b'one 2'], [], [b'three']]
+
+    # Replies are dispatched by address and carry the acknowledge
+    slaves[2][1].write(b'reply 3')
+    slaves[1][1].write(b'reply 2')
+    addresses, received, slave_received = exchange_multidrop(master_receiver, master_sender, slaves)
+
+    assert received == [(0x02, b'reply 2'), (0x03, b'reply 3')]
+
+    # Acknowledge of the replies
+    assert exchange_multidrop(master_receiver, master_sender, slaves)[0] == [0x02, 0x03]
+    assert all(len(sender.frames) == 0 for sender in master_sender.senders.values())
+    assert all(len(sender.frames) == 0 for receiver, sender in slaves)
+
+def test_multidrop_read_frames():
+    master_receiver, master_sender = multidrop([0x01, 0x02])
+    slaves = [protocol(False, address) for address in (0x01, 0x02)]
+    buffer = bytearray(128)
+    information_buffer = bytearray(128)
+    offsets = [0] * 4
+    lengths = [0] * 4
+    frames = [None] * 4
+
+    def exchange():
+        while (read := master_sender.read(buffer)) > 0:
+            for slave_receiver, slave_sender in slaves:
+                slave_receiver.write(buffer, 0, read)
+
+        for slave_receiver, slave_sender in slaves:
+            while slave_receiver.read_view() is not None:
+                pass
+
+            while (read := slave_sender.read(buffer)) > 0:
+                master_receiver.write(buffer, 0, read)
+
+    # The unnumbered acknowledge frames are handled by the stations and not returned as data
+    exchange()
+
+    assert master_receiver.read_frames(information_buffer, offsets, lengths) == 0
+    assert all(station.initialized for station in master_receiver.stations.values())
+
+    slaves[0][1].write(b'reply 1')
+    slaves[1][1].write(b'reply 2')
+    exchange()
+    # Frame from an address which is not configured
+    master_receiver.write(b'~\t\x10junk\x03\xb8~')
+
+    assert master_receiver.read_frames(information_buffer, offsets, lengths, frames) == 2
+    assert [frame.address for frame in frames[0:2]] == [0x01, 0x02]
+    assert information_buffer[0:lengths[0] + lengths[1]] == b'reply 1reply 2'
+
+    # Both stations acknowledge the replies
+    addresses = []
+
+    while (read := master_sender.read(buffer)) > 0:
+        frame = decode_frame(buffer, read, bytearray(128))[2]
+        addresses.append((frame.address, frame.frame_type))
+
+    assert addresses == [(0x01, FRAME_SUPERVISORY), (0x02, FRAME_SUPERVISORY)]
+
+def test_multidrop_weighted():
+    master_receiver, master_sender = multidrop([0x01, 0x02], window_size=7, weighted=True)
+    slaves = [protocol(False, address, window_size=7) for address in (0x01, 0x02)]
+
+    exchange_multidrop(master_receiver, master_sender, slaves)
+
+    for i in range(4):
+        master_sender.write(0x01, b'one')
+
+    master_sender.write(0x02, b'two')
+
+    # The station with more frames waiting gets a longer turn
+    assert exchange_multidrop(master_receiver, master_sender, slaves)[0] == [0x01, 0x01, 0x01, 0x01, 0x02]
+
+def test_multidrop_poll():
+    master_receiver, master_sender = multidrop([0x01, 0x02], poll_interval_ms=100)
+    slaves = [protocol(False, address) for address in (0x01, 0x02)]
+
+    exchange_multidrop(master_receiver, master_sender, slaves)
+
+    assert master_sender.timeout_ms == 100
+    assert exchange_multidrop(master_receiver, master_sender, slaves, 99)[0] == []
+    assert master_sender.timeout_ms == 1
+
+    # Idle stations are polled, giving the slaves a chance to send
+    slaves[1][1].write(b'data')
+    addresses, received, slave_received = exchange_multidrop(master_receiver, master_sender, slaves, 1)
+
+    assert addresses == [0x01, 0x02]
+    assert received == [(0x02, b'data')]
+
+    # The acknowledge of the data counts as activity
+    assert exchange_multidrop(master_receiver, master_sender, slaves)[0] == [0x02]
+    assert exchange_multidrop(master_receiver, master_sender, slaves, 100)[0] == [0x01, 0x02]
+
+@pytest.mark.parametrize('copy', [_copy_loop, _copy_slice])
+def test_copy(copy):
+    buffer = bytearray(range(10))
+    copy(buffer, buffer, 0, 2, 6)
+
+    assert buffer == bytearray([0, 1, 0, 1, 2, 3, 4, 5, 8, 9])
+
+    buffer = bytearray(range(10))
+    copy(buffer, buffer, 2, 0, 6)
+
+    assert buffer == bytearray([2, 3, 4, 5, 6, 7, 6, 7, 8, 9])
+
+    buffer = bytearray(4)
+    copy(b'test', buffer, 1, 0, 3)
+
+    assert buffer == b'est\x00'
+
+    with pytest.raises(IndexError):
+        copy(b'test', buffer, 0, 2, 4)
+
+    assert len(buffer) == 4
+
+@pytest.mark.parametrize('fcs16', [_fcs16_table, _fcs16_native])
+def test_fcs16(fcs16):
+    generator = random.Random(2)
+
+    for _ in range(200):
+        data = bytes(generator.randrange(256) for _ in range(generator.randint(0, 300)))
+        offset = generator.randint(0, len(data))
+        length = generator.randint(0, len(data) - offset)
+        acc = generator.randrange(0x10000)
+        expected = acc
+
+        for value in data[offset:offset + length]:
+            expected = (expected >> 8) ^ _CRC16_TABLE[(expected ^ value) & 0xFF]
+
+        assert fcs16(data, offset, length, acc) == expected
+        assert fcs16(memoryview(bytearray(data)), offset, length, acc) == expected
+
+    # Data followed by its FCS, least significant byte first, gives the target value
+    assert fcs16(b'\xaa\x10test 19\xa0', 0, 10) == 0xF0B8
+
+@pytest.mark.parametrize('extended', [False, True])
+def test_fast_codec_identical_output(monkeypatch, extended):
+    generator = random.Random(1)
+    frames = [
+        IFrame(0x7E, 0x3F, True, 0x7D),
+        IFrame(0x7D, 5, False, 6),
+        SFrame(0xAA, 0x7E, False, SUPERVISORY_RECEIVE_READY)]
+
+    for i in range(200):
+        data = bytes(generator.choice(b'\x7d\x7e\x5d\x5e\x00\xff') for _ in range(generator.randint(0, 64)))
+        frame = frames[i % len(frames)]
+        results = []
+
+        for fast in (False, True):
+            monkeypatch.setattr(hdlc, '_FAST_CODEC', fast)
+
+            frame_buffer = bytearray(256)
+            frame_length = encode_frame(frame, data, 0, len(data), frame_buffer, extended)
+            encoded = b'\x7e\x7e\x00' + bytes(frame_buffer[0:frame_length]) + b'garbage\x7d~'
+            information_buffer = bytearray(256)
+            decoded = []
+            offset = 0
+
+            while offset < len(encoded):
+                discard_length, information_length, decoded_frame, valid = decode_frame(
+                    encoded[offset:], len(encoded) - offset, information_buffer, extended)
+
+                if discard_length == 0:
+                    break
+
+                offset += discard_length
+                decoded.append((discard_length, information_length, repr(decoded_frame), valid,
+                    bytes(information_buffer[0:information_length])))
+
+            results.append((bytes(frame_buffer[0:frame_length]), decoded))
+
+        assert results[0] == results[1]
+        assert [entry[4] for entry in results[1][1] if entry[3]] == [data]
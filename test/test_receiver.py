@@ -1,4 +1,7 @@
-from hdlc import Receiver, SFrame, IFrame, FRAME_INFORMATION, FRAME_SUPERVISORY, SUPERVISORY_RECEIVE_READY
+from hdlc import Receiver, Sender, Demux, SFrame, IFrame
+from hdlc import FRAME_INFORMATION, FRAME_SUPERVISORY, SUPERVISORY_RECEIVE_READY
+from hdlc import hdlc
+import random
 import pytest
 
 def test_write_overflow():
@@ -242,3 +245,274 @@ def test_write_read_raw_known_supervisory_frame():
     assert frame.frame_type == FRAME_SUPERVISORY
     assert frame.receive_sequence_number == 2
     assert frame.supervisory_type == SUPERVISORY_RECEIVE_READY
+
+def test_extended_write_read_information_frame():
+    receiver = Receiver(buffer_length=64, extended=True)
+    buffer = bytearray(64)
+
+    receiver.write(b'~\xaa\xb4\xc9test"\xb3~')
+    read, frame, valid = receiver.read_frame(buffer)
+
+    assert read == 4
+    assert valid
+    assert isinstance(frame, IFrame)
+    assert frame.address == 0xAA
+    assert frame.poll_final
+    assert frame.receive_sequence_number == 100
+    assert frame.send_sequence_number == 90
+    assert buffer[0:4] == b'test'
+
+    receiver.write(b'~\xaa\x01\xfeH\xbd~')
+    read, frame, valid = receiver.read_frame(buffer)
+
+    assert read == 0
+    assert valid
+    assert isinstance(frame, SFrame)
+    assert not frame.poll_final
+    assert frame.receive_sequence_number == 127
+    assert frame.supervisory_type == SUPERVISORY_RECEIVE_READY
+
+def test_byte_by_byte_write_read():
+    receiver = Receiver(buffer_length=64)
+    buffer = bytearray(64)
+    data = b'~\xaapa}^b}]c\x9c\xba~'
+
+    for i in range(len(data) - 1):
+        receiver.write(data, i, 1)
+        read, frame, valid = receiver.read_frame(buffer)
+
+        assert read == 0
+        assert frame is None
+        assert not valid
+        assert receiver.length == i + 1
+
+    receiver.write(data, len(data) - 1, 1)
+    read, frame, valid = receiver.read_frame(buffer)
+
+    assert read == 5
+    assert valid
+    assert isinstance(frame, IFrame)
+    assert frame.address == 0xAA
+    assert buffer[0:5] == b'a~b}c'
+    assert receiver.length == 1
+
+def test_wrapping_write_read():
+    receiver = Receiver(buffer_length=16)
+    buffer = bytearray(16)
+
+    for i in range(10):
+        receiver.write(b'\xaaptest\xe6\xb0~' if i > 0 else b'~\xaaptest\xe6\xb0~')
+
+        assert receiver.length == 10
+        assert receiver.available_length == 6
+
+        read, frame, valid = receiver.read_frame(buffer)
+
+        assert read == 4
+        assert valid
+        assert isinstance(frame, IFrame)
+        assert buffer[0:4] == b'test'
+        assert receiver.length == 1
+        assert receiver.available_length == 15
+
+    with pytest.raises(ValueError, match='Buffer length exceeded'):
+        receiver.write(bytearray(16))
+
+def test_fast_codec_chunked_write_read(monkeypatch):
+    generator = random.Random(2)
+    stream = bytes(generator.choice(b'~}\x5d\x5e\xaapt') for _ in range(4096))
+    results = []
+
+    for fast in (False, True):
+        monkeypatch.setattr(hdlc, '_FAST_CODEC', fast)
+
+        receiver = Receiver(buffer_length=100)
+        buffer = bytearray(100)
+        chunks = random.Random(3)
+        decoded = []
+        offset = 0
+
+        while offset < len(stream):
+            length = min(chunks.randint(1, 40), len(stream) - offset, receiver.available_length)
+
+            receiver.write(stream, offset, length)
+            offset += length
+
+            while True:
+                read, frame, valid = receiver.read_frame(buffer)
+
+                if frame is None:
+                    break
+
+                decoded.append((read, repr(frame), valid, bytes(buffer[0:read])))
+
+            if receiver.available_length == 0:
+                receiver.reset()
+
+        results.append(decoded)
+
+    assert len(results[0]) > 0
+    assert results[0] == results[1]
+
+def test_read_frame_view():
+    receiver = Receiver(buffer_length=16)
+
+    # Information data without escapes is not copied, also when written in chunks
+    receiver.write(b'~\xaapte')
+    receiver.write(b'st\xe6\xb0~')
+    view, frame, valid = receiver.read_frame_view()
+
+    assert valid
+    assert isinstance(frame, IFrame)
+    assert view == b'test'
+    assert view.obj is receiver.buffer
+
+    # Escaped information data
+    receiver.write(b'\xaapa}^b}]c\x9c\xba~')
+    view, frame, valid = receiver.read_frame_view()
+
+    assert valid
+    assert view == b'a~b}c'
+    assert view.obj is not receiver.buffer
+
+    # Information data wrapping around the end of the buffer
+    receiver.write(b'~~~~~\xaaptest\xe6\xb0~')
+    view, frame, valid = receiver.read_frame_view()
+
+    assert valid
+    assert view == b'test'
+    assert view.obj is not receiver.buffer
+
+    assert receiver.read_frame_view() == (None, None, False)
+    assert receiver.length == 1
+
+def test_read_frames():
+    receiver = Receiver(buffer_length=64)
+    information_buffer = bytearray(8)
+    offsets = [0] * 4
+    lengths = [0] * 4
+    frames = [None] * 4
+
+    # The frame with an invalid checksum is skipped
+    receiver.write(b'~\xaaptest\xe6\xb0~\xaapxyz\x00\x00~\xaapab\x0c>~\xaapa}^b}]c\x9c\xba~\xaapO.~')
+
+    assert receiver.read_frames(information_buffer, offsets, lengths, frames) == 2
+    assert offsets[0:2] == [0, 4]
+    assert lengths[0:2] == [4, 2]
+    assert information_buffer[0:6] == b'testab'
+    assert all(isinstance(frame, IFrame) for frame in frames[0:2])
+
+    # The frame which did not fit in the information buffer is read by the next call
+    assert receiver.read_frames(information_buffer, offsets, lengths) == 2
+    assert offsets[0:2] == [0, 5]
+    assert lengths[0:2] == [5, 0]
+    assert information_buffer[0:5] == b'a~b}c'
+
+    assert receiver.read_frames(information_buffer, offsets, lengths) == 0
+    assert receiver.length == 1
+
+def test_iter_frames():
+    generator = random.Random(4)
+    sender = Sender(buffer_length=512)
+    frame_buffer = bytearray(1024)
+    stream = bytearray()
+    expected = []
+
+    for i in range(500):
+        data = bytes(generator.choice(b'~}ab') for _ in range(generator.randint(0, 100) if i % 50 != 49 else 300))
+        sender.write_frame(IFrame(0xAA, 0, False, i % 8), data)
+        stream += frame_buffer[0:sender.read(frame_buffer)]
+
+        if len(data) <= 100:
+            # Longer frames do not fit in the receiver buffer
+            expected.append((data, i % 8))
+
+    consumed = []
+
+    def chunks():
+        offset = 0
+
+        while offset < len(stream):
+            length = generator.randint(1, 300)
+            consumed.append(offset)
+            yield stream[offset:offset + length]
+            offset += length
+
+    receiver = Receiver(buffer_length=256)
+    frames = receiver.iter_frames(chunks())
+
+    data, frame, valid = next(frames)
+
+    # Input is consumed lazily
+    assert len(consumed) == 1
+    assert (data, frame.send_sequence_number) == expected[0]
+    assert valid
+
+    received = [(data, frame.send_sequence_number) for data, frame, valid in frames if valid]
+
+    assert received == expected[1:]
+
+def test_demux():
+    sender = Sender(buffer_length=256)
+    frame_buffer = bytearray(64)
+    stream = bytearray()
+
+    for i in range(6):
+        sender.write_frame(IFrame((0x01, 0x02, 0x03)[i % 3], 0, False, i), b'data ' + bytes(str(i), encoding='utf8'))
+        stream += frame_buffer[0:sender.read(frame_buffer)]
+
+    handled = []
+    demux = Demux(buffer_length=32)
+    demux.register(0x01, lambda view, frame, valid: handled.append((bytes(view), frame.send_sequence_number, valid)))
+    demux.register(0x02)
+
+    for i in range(0, len(stream), 7):
+        demux.write(stream, i, min(7, len(stream) - i))
+
+    assert handled == [(b'data 0', 0, True), (b'data 3', 3, True)]
+    assert demux.queued(0x02) == 2
+    assert demux.dropped == 2
+
+    buffer = bytearray(32)
+    read, frame, valid = demux.read_frame(0x02, buffer)
+
+    assert read == 6
+    assert valid
+    assert frame.send_sequence_number == 1
+    assert buffer[0:6] == b'data 1'
+
+    read, frame, valid = demux.read_frame(0x02, buffer)
+
+    assert read == 6
+    assert frame.send_sequence_number == 4
+    assert buffer[0:6] == b'data 4'
+    assert demux.read_frame(0x02, buffer) == (0, None, False)
+
+def test_demux_backpressure():
+    sender = Sender(buffer_length=256)
+    frame_buffer = bytearray(64)
+    stream = bytearray()
+
+    for i in range(4):
+        sender.write_frame(IFrame(0xAA, 0, False, i), b'test')
+        stream += frame_buffer[0:sender.read(frame_buffer)]
+
+    demux = Demux(buffer_length=64, queue_length=2)
+    demux.register(0xAA)
+    demux.write(stream)
+
+    # Two frames are held back in the buffer while the queue is full
+    assert demux.queued(0xAA) == 2
+    assert demux.available_length == 64 - 21
+
+    buffer = bytearray(64)
+
+    for i in range(4):
+        read, frame, valid = demux.read_frame(0xAA, buffer)
+
+        assert read == 4
+        assert valid
+        assert frame.send_sequence_number == i
+
+    assert demux.queued(0xAA) == 0
+    assert demux.available_length == 63
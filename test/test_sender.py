@@ -1,4 +1,6 @@
-from hdlc import TimeoutError, Sender, SFrame, SUPERVISORY_RECEIVE_READY
+from hdlc import TimeoutError, Sender, IFrame, SFrame, UFrame, SUPERVISORY_RECEIVE_READY
+from hdlc.hdlc import decode_frame
+import random
 import pytest
 
 def test_write_overflow():
@@ -201,3 +203,529 @@ def test_write_read_ready_with_priority():
     assert read == 10
     assert buffer[0:10] == b'~\xaaptest\xe6\xb0~'
     assert len(sender.frames) == 1
+
+def test_invalid_window_size():
+    with pytest.raises(ValueError, match='Invalid window size'):
+        Sender(window_size=0)
+
+    with pytest.raises(ValueError, match='Invalid window size'):
+        Sender(window_size=8)
+
+    with pytest.raises(ValueError, match='Invalid window size'):
+        Sender(window_size=128, extended=True)
+
+def test_window_write_read():
+    sender = Sender(buffer_length=64, write_retries=1, write_timeout_ms=100, window_size=2)
+    buffer = bytearray(64)
+
+    sender.write(b'test 1', address=0xAA)
+    sender.write(b'test 2', address=0xAA)
+    sender.write(b'test 3', address=0xAA)
+
+    assert len(sender.frames) == 3
+
+    read = sender.read(buffer)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x10test 19\xa0~'
+
+    read = sender.read(buffer)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x12test 2\x19\xa5~'
+    assert len(sender.frames) == 3
+
+    read = sender.read(buffer)
+
+    assert read == 0
+
+    sender.remove_information_frame(1)
+
+    assert len(sender.frames) == 2
+    assert sender.length == 12
+
+    read = sender.read(buffer)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x14test 3]\xec~'
+    assert len(sender.frames) == 2
+
+def test_window_write_read_after_timeout():
+    sender = Sender(buffer_length=64, write_retries=1, write_timeout_ms=100, window_size=2)
+    buffer = bytearray(64)
+
+    sender.write(b'test 1', address=0xAA)
+    sender.write(b'test 2', address=0xAA)
+
+    read = sender.read(buffer)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x10test 19\xa0~'
+
+    read = sender.read(buffer, delta_ms=50)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x12test 2\x19\xa5~'
+
+    read = sender.read(buffer, delta_ms=50)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x10test 19\xa0~'
+
+    read = sender.read(buffer, delta_ms=50)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x12test 2\x19\xa5~'
+
+    read = sender.read(buffer)
+
+    assert read == 0
+    assert len(sender.frames) == 2
+
+def test_window_cumulative_acknowledge():
+    sender = Sender(buffer_length=64, write_retries=1, write_timeout_ms=100, window_size=3)
+    buffer = bytearray(64)
+
+    sender.write(b'test 1', address=0xAA)
+    sender.write(b'test 2', address=0xAA)
+    sender.write(b'test 3', address=0xAA)
+    sender.write(b'test 4', address=0xAA)
+
+    for i in range(3):
+        assert sender.read(buffer) == 12
+
+    assert len(sender.frames) == 4
+    assert sender.length == 24
+
+    # Sequence number not outstanding
+    sender.remove_information_frame(0)
+
+    assert len(sender.frames) == 4
+
+    sender.remove_information_frame(2)
+
+    assert len(sender.frames) == 2
+    assert sender.length == 12
+    assert sender.available_length == 52
+
+    read = sender.read(buffer)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x16test 4Y\xaf~'
+    assert len(sender.frames) == 2
+
+    sender.write(b'test 5', address=0xAA)
+    sender.remove_information_frame(4)
+
+    assert len(sender.frames) == 1
+    assert sender.length == 6
+
+    read = sender.read(buffer)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x18test 5\xf18~'
+
+def test_write_read_piggyback_acknowledge():
+    sender = Sender(buffer_length=64)
+    buffer = bytearray(64)
+
+    sender.write(b'test', address=0xAA, receive_sequence_number=None)
+    sender.write_frame(SFrame(0xAA, 2, False, SUPERVISORY_RECEIVE_READY), priority=1)
+    sender.receive_sequence_number = 2
+
+    assert len(sender.frames) == 2
+
+    read = sender.read(buffer)
+
+    assert read == 10
+    assert buffer[0:10] == b'~\xaaPtestw\xd0~'
+    assert len(sender.frames) == 1
+
+    read = sender.read(buffer)
+
+    assert read == 0
+
+def test_resend_information_frame():
+    sender = Sender(buffer_length=64, write_retries=1, write_timeout_ms=100, window_size=2)
+    buffer = bytearray(64)
+
+    sender.write(b'test 1', address=0xAA)
+    sender.write(b'test 2', address=0xAA)
+
+    assert sender.read(buffer) == 12
+    assert sender.read(buffer) == 12
+
+    # Sequence number not outstanding is ignored
+    sender.resend_information_frame(2)
+    sender.resend_information_frame(1)
+
+    read = sender.read(buffer)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x12test 2\x19\xa5~'
+
+    read = sender.read(buffer)
+
+    assert read == 0
+
+    sender.resend_information_frame(1)
+
+    with pytest.raises(TimeoutError, match='Did not receive ack within timeout'):
+        sender.read(buffer)
+
+    assert len(sender.frames) == 1
+
+def test_resend_information_frames():
+    sender = Sender(buffer_length=64, write_retries=1, write_timeout_ms=100, window_size=3)
+    buffer = bytearray(64)
+
+    sender.write(b'test 1', address=0xAA)
+    sender.write(b'test 2', address=0xAA)
+    sender.write(b'test 3', address=0xAA)
+
+    for i in range(3):
+        assert sender.read(buffer) == 12
+
+    sender.resend_information_frames(1)
+
+    assert len(sender.frames) == 2
+
+    read = sender.read(buffer)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x12test 2\x19\xa5~'
+
+    read = sender.read(buffer)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x14test 3]\xec~'
+
+    read = sender.read(buffer)
+
+    assert read == 0
+
+def test_extended_write_read():
+    sender = Sender(buffer_length=64, window_size=127, extended=True)
+    buffer = bytearray(64)
+
+    sender.sequence_number = 90
+    sender.write(b'test', address=0xAA, receive_sequence_number=100, poll_final=True)
+
+    assert sender.sequence_number == 91
+
+    read = sender.read(buffer)
+
+    assert read == 11
+    assert buffer[0:11] == b'~\xaa\xb4\xc9test"\xb3~'
+
+    sender.write_frame(SFrame(0xAA, 127, False, SUPERVISORY_RECEIVE_READY))
+    read = sender.read(buffer)
+
+    assert read == 7
+    assert buffer[0:7] == b'~\xaa\x01\xfeH\xbd~'
+
+    sender.remove_information_frame(91)
+
+    assert len(sender.frames) == 0
+
+def test_queue_remove():
+    generator = random.Random(3)
+    queue = Sender._Queue(lambda a, b: a[0] < b[0])
+    expected = []
+
+    for i in range(2000):
+        if len(expected) > 0 and generator.random() < 0.3:
+            item = generator.choice(expected)
+            queue.remove(item)
+            expected.remove(item)
+        elif len(expected) > 0 and generator.random() < 0.3:
+            item = queue.pop()
+
+            assert item[0] == min(expected)[0]
+            expected.remove(item)
+        else:
+            item = (generator.randrange(100), i)
+            queue.push(item)
+            expected.append(item)
+
+        assert len(queue) == len(expected)
+        assert sorted(queue) == sorted(expected)
+
+        if len(expected) > 0:
+            assert queue.first()[0] == min(expected)[0]
+
+def test_write_read_piggyback_acknowledge_address():
+    sender = Sender(buffer_length=64)
+    buffer = bytearray(64)
+
+    sender.write_frame(SFrame(0xAA, 0, False, SUPERVISORY_RECEIVE_READY))
+    sender.write_frame(SFrame(0xBB, 0, False, SUPERVISORY_RECEIVE_READY))
+    sender.write(b'test', address=0xAA, receive_sequence_number=None)
+
+    assert len(sender.frames) == 3
+
+    read = sender.read(buffer)
+
+    assert read == 10
+    assert buffer[0:2] == b'~\xaa'
+    assert len(sender.frames) == 2
+
+    read = sender.read(buffer)
+
+    assert read == 6
+    assert buffer[0:2] == b'~\xbb'
+    assert len(sender.frames) == 1
+
+    assert sender.read(buffer) == 0
+
+def test_write_read_same_priority_order():
+    sender = Sender(buffer_length=16384)
+    buffer = bytearray(64)
+    information_buffer = bytearray(64)
+
+    for i in range(3000):
+        frame = IFrame(0xAA, 0, False, i % 8)
+        sender.write_frame(frame, bytes(str(i), encoding='utf8'), priority=i % 2)
+
+    received = []
+
+    while (read := sender.read(buffer)) > 0:
+        _, information_length, frame, valid = decode_frame(buffer, read, information_buffer)
+
+        assert valid
+
+        received.append((frame.send_sequence_number, bytes(information_buffer[0:information_length])))
+
+    expected = [(i % 8, bytes(str(i), encoding='utf8')) for i in range(1, 3000, 2)]
+    expected += [(i % 8, bytes(str(i), encoding='utf8')) for i in range(0, 3000, 2)]
+
+    assert received == expected
+    assert sender.length == 0
+
+def test_write_read_ring_buffer():
+    sender = Sender(buffer_length=16, window_size=3)
+    buffer = bytearray(64)
+
+    sender.write(b'test 1', address=0xAA)
+    sender.write(b'test 2', address=0xAA)
+    sender.write_frame(SFrame(0xAA, 0, False, SUPERVISORY_RECEIVE_READY), b'xx')
+
+    assert sender.length == 14
+    assert sender.available_length == 2
+
+    assert sender.read(buffer) == 12
+    assert sender.read(buffer) == 12
+
+    # The space of the sent receive ready frame is held until the frames before it are removed
+    assert sender.read(buffer) == 8
+    assert sender.length == 12
+    assert sender.available_length == 2
+
+    sender.resend_information_frames(1)
+
+    assert sender.length == 6
+    assert sender.available_length == 8
+
+    # Payload wraps around the end of the buffer
+    sender.write(b'test 3', address=0xAA)
+
+    assert sender.available_length == 2
+
+    read = sender.read(buffer)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x12test 2\x19\xa5~'
+
+    read = sender.read(buffer)
+
+    assert read == 12
+    assert buffer[0:12] == b'~\xaa\x14test 3]\xec~'
+
+    sender.remove_information_frame(3)
+
+    assert sender.length == 0
+    assert sender.available_length == 16
+
+def test_write_read_encoded_cache():
+    sender = Sender(buffer_length=64, write_retries=3, write_timeout_ms=100)
+    buffer = bytearray(64)
+
+    sender.write(b'test', address=0xAA, receive_sequence_number=None)
+
+    assert sender.read(buffer) == 10
+    assert buffer[0:10] == b'~\xaa\x10testU\x11~'
+    assert (sender.cache_hits, sender.cache_misses) == (0, 1)
+
+    buffer[0:10] = bytes(10)
+
+    assert sender.read(buffer, delta_ms=100) == 10
+    assert buffer[0:10] == b'~\xaa\x10testU\x11~'
+    assert (sender.cache_hits, sender.cache_misses) == (1, 1)
+
+    # Changed receive sequence number requires the frame to be encoded again
+    sender.receive_sequence_number = 2
+
+    assert sender.read(buffer, delta_ms=100) == 10
+    assert buffer[0:10] == b'~\xaaPtestw\xd0~'
+    assert (sender.cache_hits, sender.cache_misses) == (1, 2)
+
+    sender.remove_information_frame(1)
+
+    assert len(sender.frames) == 0
+
+def test_write_read_encoded_cache_limit():
+    sender = Sender(buffer_length=64, write_retries=3, write_timeout_ms=100, cache_length=9)
+    buffer = bytearray(64)
+
+    sender.write(b'test', address=0xAA)
+
+    for i in range(3):
+        assert sender.read(buffer, delta_ms=100 if i > 0 else 0) == 10
+        assert buffer[0:10] == b'~\xaa\x10testU\x11~'
+
+    assert (sender.cache_hits, sender.cache_misses) == (0, 3)
+
+def test_read_many():
+    sender = Sender(buffer_length=64, write_retries=1, write_timeout_ms=100, window_size=3)
+    buffer = bytearray(64)
+
+    sender.write(b'test 1', address=0xAA)
+    sender.write(b'test 2', address=0xAA)
+    sender.write(b'test 3', address=0xAA)
+    sender.write(b'test 4', address=0xAA)
+
+    assert sender.read_many(buffer, max_frames=1) == 12
+    assert buffer[0:12] == b'~\xaa\x10test 19\xa0~'
+
+    # Frames share the flag between them, the third does not fit and is left in the queue
+    read = sender.read_many(memoryview(buffer)[0:30])
+
+    assert read == 23
+    assert buffer[0:23] == b'~\xaa\x12test 2\x19\xa5~' + b'\xaa\x14test 3]\xec~'
+
+    # Window is full
+    assert sender.read_many(buffer) == 0
+    assert len(sender.frames) == 4
+
+    read = sender.read_many(buffer, delta_ms=100)
+
+    assert read == 34
+    assert buffer[0:34] == b'~\xaa\x10test 19\xa0~\xaa\x12test 2\x19\xa5~\xaa\x14test 3]\xec~'
+
+    sender.remove_information_frame(1)
+    sender.write_frame(SFrame(0xAA, 0, False, SUPERVISORY_RECEIVE_READY), priority=1)
+
+    # Frame reaching the retry limit ends the batch without raising
+    assert sender.read_many(buffer, delta_ms=100) == 6
+    assert buffer[0:6] == b'~\xaa\x01AL~'
+    assert len(sender.frames) == 3
+
+    with pytest.raises(TimeoutError, match='Did not receive ack within timeout'):
+        sender.read_many(buffer)
+
+    assert len(sender.frames) == 2
+
+def test_read_many_buffer_too_small():
+    sender = Sender(buffer_length=64)
+    buffer = bytearray(64)
+
+    sender.write(b'test 1', address=0xAA)
+
+    with pytest.raises(ValueError, match='Frame buffer too small'):
+        sender.read_many(memoryview(buffer)[0:8])
+
+    # The frame is left in the queue
+    assert sender.read_many(buffer) == 12
+    assert buffer[0:12] == b'~\xaa\x10test 19\xa0~'
+
+def test_drain_settle():
+    sender = Sender(buffer_length=64, write_retries=0, write_timeout_ms=100, window_size=3)
+    buffer = bytearray(sender.frame_buffer_length)
+    written = []
+
+    waiters = [(sender.write(data, address=0xAA), sender.generation, data) for data in (b'test 1', b'test 2')]
+
+    assert sender.drain(buffer, written.append) == []
+    assert written == [b'~\xaa\x10test 19\xa0~\xaa\x12test 2\x19\xa5~']
+
+    sender.remove_information_frame(1)
+    waiters, acknowledged, dropped = sender.settle(waiters)
+
+    assert [waiter[2] for waiter in waiters] == [b'test 2']
+    assert (acknowledged, dropped) == ([b'test 1'], [])
+
+    # Information frames reaching the retry limit are returned, the remaining frames are still sent
+    sender.write_frame(SFrame(0xAA, 0, False, SUPERVISORY_RECEIVE_READY))
+    errors = sender.drain(buffer, written.append, delta_ms=100)
+
+    assert [error.frame.send_sequence_number for error in errors] == [1]
+    assert written[1:] == [b'~\xaa\x01AL~']
+
+    waiters = [(sender.write(b'test 3', address=0xAA), sender.generation, b'test 3')]
+    sender.reset()
+
+    assert sender.settle(waiters) == ([], [], [b'test 3'])
+
+    sender.write_frame(UFrame(0xAA, 0x08, True), retry=True)
+    sender.drain(buffer, written.append)
+
+    with pytest.raises(TimeoutError):
+        sender.drain(buffer, written.append, delta_ms=100)
+
+def test_acknowledge_delay():
+    sender = Sender(buffer_length=64)
+    buffer = bytearray(64)
+
+    sender.receive_sequence_number = 1
+    sender.acknowledge(0xAA, 1, 3, 100)
+
+    assert sender.read(buffer, delta_ms=50) == 0
+
+    sender.receive_sequence_number = 2
+    sender.acknowledge(0xAA, 1, 3, 100)
+
+    assert sender.read(buffer, delta_ms=49) == 0
+
+    # Delay counted from the first unacknowledged frame
+    read = sender.read(buffer, delta_ms=1)
+
+    assert read == 6
+    assert buffer[0:6] == b'~\xaaAE\x0e~'
+    assert sender.read(buffer, delta_ms=100) == 0
+
+    # Number of frames reached
+    sender.receive_sequence_number = 5
+
+    for i in range(3):
+        assert sender.read(buffer) == 0
+
+        sender.acknowledge(0xAA, 1, 3, 100)
+
+    read = sender.read(buffer)
+
+    assert read == 6
+    assert buffer[0:6] == b'~\xaa\xa1K\xe9~'
+
+    # Dropped when an information frame carries the acknowledge
+    sender.acknowledge(0xAA, 1, 3, 100)
+    sender.write(b'test', address=0xAA, receive_sequence_number=None)
+
+    assert sender.read(buffer) == 10
+    assert sender.read(buffer, delta_ms=100) == 0
+
+def test_write_read_mixed_order():
+    sender = Sender(buffer_length=64, window_size=3)
+    buffer = bytearray(64)
+    information_buffer = bytearray(64)
+
+    sender.write(b'first', address=0xAA)
+    sender.write_frame(UFrame(0xAA, 0x00, False), b'second')
+    sender.write(b'third', address=0xAA)
+
+    sent = []
+
+    while (read := sender.read(buffer)) > 0:
+        _, information_length, frame, valid = decode_frame(buffer, read, information_buffer)
+        sent.append(bytes(information_buffer[0:information_length]))
+
+    assert sent == [b'first', b'second', b'third']
@@ -0,0 +1,111 @@
+from hdlc import TimeoutError
+from hdlc.threaded import ThreadedLink
+import queue
+import threading
+import pytest
+
+class Pipe:
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.dropping = False
+        self.written = threading.Event()
+
+    def read(self, length):
+        try:
+            return self.queue.get(timeout=0.001)
+        except queue.Empty:
+            return b''
+
+    def write(self, data):
+        self.written.set()
+
+        if not self.dropping:
+            self.queue.put(data)
+
+def test_transfer():
+    master_pipe, slave_pipe = Pipe(), Pipe()
+    master = ThreadedLink(master_pipe.read, slave_pipe.write, True, 0xAA, window_size=7, write_timeout_ms=200)
+    slave = ThreadedLink(slave_pipe.read, master_pipe.write, False, 0xAA, window_size=7)
+
+    with master, slave:
+        messages = [b'test ' + bytes(str(i), encoding='utf8') for i in range(100)]
+        threads = [threading.Thread(target=lambda i=i: [master.send(message) for message in messages[i::4]])
+            for i in range(4)]
+
+        for thread in threads:
+            thread.start()
+
+        received = [slave.recv(timeout=5) for _ in messages]
+
+        for thread in threads:
+            thread.join()
+
+        slave.send(b'reply')
+
+        assert master.recv(timeout=5) == b'reply'
+        assert sorted(received) == sorted(messages)
+        assert slave.recv(timeout=0.01) is None
+
+    assert master.error is None
+    assert slave.recv() is None
+
+    with pytest.raises(ConnectionError):
+        master.send(b'test')
+
+def test_send_timeout():
+    master_pipe, slave_pipe = Pipe(), Pipe()
+    master = ThreadedLink(master_pipe.read, slave_pipe.write, True, 0xAA, write_timeout_ms=20, write_retries=1)
+    slave = ThreadedLink(slave_pipe.read, master_pipe.write, False, 0xAA)
+
+    with master, slave:
+        master.send(b'test 1')
+        slave_pipe.dropping = True
+
+        with pytest.raises(TimeoutError, match='Did not receive ack within timeout') as error:
+            master.send(b'test 2')
+
+        assert error.value.frame.send_sequence_number == 1
+
+def test_handshake_timeout():
+    master_pipe, slave_pipe = Pipe(), Pipe()
+    slave_pipe.dropping = True
+    master = ThreadedLink(master_pipe.read, slave_pipe.write, True, 0xAA, write_timeout_ms=20, write_retries=1)
+
+    with master:
+        with pytest.raises(TimeoutError):
+            master.send(b'test')
+
+        assert master.recv() is None
+        assert isinstance(master.error, TimeoutError)
+
+def test_send_reset():
+    master_pipe, slave_pipe = Pipe(), Pipe()
+    master = ThreadedLink(master_pipe.read, slave_pipe.write, True, 0xAA, write_timeout_ms=1000)
+    slave = ThreadedLink(slave_pipe.read, master_pipe.write, False, 0xAA, write_timeout_ms=1000)
+    errors = []
+
+    def send():
+        try:
+            slave.send(b'test 2')
+        except ConnectionError as e:
+            errors.append(e)
+
+    with master, slave:
+        master.send(b'test 1')
+
+        assert slave.recv(timeout=5) == b'test 1'
+
+        master_pipe.dropping = True
+        master_pipe.written.clear()
+        thread = threading.Thread(target=send)
+        thread.start()
+
+        assert master_pipe.written.wait(timeout=5)
+
+        # A new handshake from the master discards the unacknowledged frame
+        slave_pipe.write(b'~\xaaS\xd6=~')
+        thread.join(timeout=5)
+
+        assert not thread.is_alive()
+        assert len(errors) == 1
+        assert str(errors[0]) == 'Link reset before the frame was acknowledged'